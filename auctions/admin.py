@@ -2,6 +2,8 @@ from django.contrib import admin
 
 class BidAdmin(admin.ModelAdmin):
     list_display = ("price", "user", "listing")
+class ProxyBidAdmin(admin.ModelAdmin):
+    list_display = ("max_price", "user", "listing")
 class WatchlistAdmin(admin.ModelAdmin):
     list_display = ("listing", "user")
     ordering = ["user"]
@@ -12,4 +14,5 @@ admin.site.register(User)
 admin.site.register(Listing)
 admin.site.register(Watchlist, WatchlistAdmin)
 admin.site.register(Category)
-admin.site.register(Bid, BidAdmin)
\ No newline at end of file
+admin.site.register(Bid, BidAdmin)
+admin.site.register(ProxyBid, ProxyBidAdmin)
\ No newline at end of file
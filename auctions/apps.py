@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class AuctionsConfig(AppConfig):
     name = 'auctions'
+
+    def ready(self):
+        from . import checks, signals
+        from .search import reinstall_after_migrate
+        post_migrate.connect(reinstall_after_migrate, sender=self)
@@ -0,0 +1,114 @@
+import mimetypes
+import os
+from urllib.parse import unquote
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+from .storage import HASHED_NAME
+
+# best first, each one served from the sibling file collectstatic wrote
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header: str) -> set:
+    """
+    Examples:
+        'gzip, deflate, br' -> {'gzip', 'deflate', 'br'}\n
+        'br;q=0, gzip;q=0.8' -> {'gzip'}
+    """
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if encoding:
+            accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class AssetMiddleware:
+    """
+    serve STATIC_URL from STATIC_ROOT and MEDIA_URL from MEDIA_ROOT before sessions, auth or the database are touched\n
+    Content-hashed names (collectstatic with CompressedManifestStaticFilesStorage, uploads with
+    HashedMediaStorage) are sent with a one year immutable Cache-Control, so a repeat visit
+    doesn't even revalidate them. Other files get an ETag and are revalidated with a 304.
+    The precompressed .br/.gz sibling is sent when the client accepts it (Vary: Accept-Encoding)\n
+    Under runserver with DEBUG, STATIC_URL is answered by staticfiles first, from the app folders
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.roots = [
+            (url, root) for url, root in ((settings.STATIC_URL, settings.STATIC_ROOT), (settings.MEDIA_URL, settings.MEDIA_ROOT))
+            if url and root
+        ]
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        path = self.find(request)
+        return self.serve(request, path) if path else self.get_response(request)
+
+    async def __acall__(self, request):
+        path = self.find(request)
+        return self.serve(request, path) if path else await self.get_response(request)
+
+    def find(self, request) -> str | None:
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        for url, root in self.roots:
+            if request.path.startswith(url):
+                try:
+                    path = safe_join(root, unquote(request.path[len(url):]))
+                except (SuspiciousFileOperation, ValueError):
+                    return None
+                return path if os.path.isfile(path) else None
+        return None
+
+    def serve(self, request, path: str):
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        served, encoding = path, None
+        for name, suffix in ENCODINGS:
+            if name in accepted and os.path.isfile(path + suffix):
+                served, encoding = path + suffix, name
+                break
+
+        stat = os.stat(served)
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        headers = {
+            'ETag': etag,
+            'Last-Modified': http_date(stat.st_mtime),
+            'Cache-Control': (
+                f'public, max-age={settings.ASSET_IMMUTABLE_MAX_AGE}, immutable' if HASHED_NAME.search(path)
+                else 'public, no-cache'
+            ),
+        }
+        if any(os.path.isfile(path + suffix) for _, suffix in ENCODINGS):
+            headers['Vary'] = 'Accept-Encoding'
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(served, 'rb'), content_type=content_type)
+            # FileResponse names the .gz/.br file it was given, the browser must see the asset itself
+            response.headers.pop('Content-Disposition', None)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        for header, value in headers.items():
+            response[header] = value
+        return response
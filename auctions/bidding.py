@@ -0,0 +1,199 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Case, When, Value
+from django.utils import timezone
+
+from .helpers import ListingNotActive, BidTooLow, MaxBidTooLow, BidOnOwnListing
+from .models import Listing, Bid, ProxyBid
+from .category_stats import count_bulk_bids
+from .signals import invalidate_listing_fragments
+from .trending import record_event
+from .retry import retry_on_lock
+
+
+@retry_on_lock
+def accept_bid(listing_id: int, user, price: int, max_price: int | None = None) -> Bid:
+    """
+    place a bid on a listing, serialized per listing, and let the proxy bids answer it\n
+    The listing row is updated only if the auction is active, not past its end time, not the
+    user's own and the bid beats the current price, in the same statement that checks it. The database row lock
+    taken by that UPDATE makes concurrent bids on the same listing queue up, so a stale bid
+    can never overwrite a higher one or land on another listing.\n
+    A bid in the last AUCTION_SOFT_CLOSE_SECONDS of a timed auction pushes its end time so
+    there's always that long left to answer it (anti-sniping).\n
+    max_price stores (or replaces) the user's proxy bid: a hidden maximum the engine bids up to
+    on their behalf. Every proxy of the listing is resolved before the lock is released, see
+    resolve_proxy_bids.\n
+    Returns the leading bid, which isn't the user's when a higher proxy outbid them.\n
+    Raises Listing.DoesNotExist, ListingNotActive, BidOnOwnListing, BidTooLow or MaxBidTooLow when rejected
+    """
+    if max_price is not None and max_price < price:
+        raise MaxBidTooLow
+    now = timezone.now()
+    soft_close_end = now + timedelta(seconds=settings.AUCTION_SOFT_CLOSE_SECONDS)
+    with transaction.atomic():
+        updated = Listing.objects.filter(
+            Q(end_time__isnull=True) | Q(end_time__gt=now),
+            ~Q(author=user),
+            pk=listing_id, active=True, current_price__lt=price
+        ).update(
+            current_price = price,
+            current_bidder = user,
+            bid_count = F('bid_count') + 1,
+            end_time = Case(When(end_time__lt=soft_close_end, then=Value(soft_close_end)), default=F('end_time'))
+        )
+        if not updated:
+            listing = Listing.objects.only('active', 'end_time', 'author_id').get(pk=listing_id)
+            if not listing.active or listing.is_expired(): raise ListingNotActive
+            # the author's bids would only drive the price up, and win the auction for no one
+            if listing.author_id == user.id: raise BidOnOwnListing
+            raise BidTooLow
+
+        bid = Bid.objects.create(
+            price = price,
+            user = user,
+            listing_id = listing_id
+        )
+        if max_price is not None:
+            ProxyBid.objects.update_or_create(listing_id=listing_id, user=user, defaults={'max_price': max_price})
+        return resolve_proxy_bids(bid) or bid
+
+
+@retry_on_lock
+def accept_bids(user, items: list) -> tuple[list, dict]:
+    """
+    place a batch of bids for one user, with a fixed number of queries whatever its size\n
+    items are (listing_id, price) pairs, None for an item that couldn't be read. The listings
+    are read (and locked, in id order so two batches can't deadlock) with one query and every
+    bid is checked against them in memory, like accept_bid checks it in its UPDATE: the auction
+    is active, not past its end time, not the user's own, and the bid beats the current price,
+    including the bids accepted before it in the batch. The accepted bids are inserted with one bulk_create and
+    their listings updated with one UPDATE, soft close included, in the same transaction.
+    Proxy bids of other users then answer the listings they're above, see resolve_proxy_bids.\n
+    Returns one result per item, in order, {'listing_id', 'price', 'status'} with status
+    'accepted', 'outbid' (accepted, then outbid by a proxy bid), 'too_low', 'not_active',
+    'own_listing', 'not_found' or 'invalid', and the leading bid of every listing that got one, by listing id
+    """
+    now = timezone.now()
+    soft_close_end = now + timedelta(seconds=settings.AUCTION_SOFT_CLOSE_SECONDS)
+    with transaction.atomic():
+        listings = {
+            pk: {'price': current_price, 'open': active and (end_time is None or end_time > now), 'own': author_id == user.id}
+            for pk, current_price, active, end_time, author_id in Listing.objects.select_for_update().filter(
+                pk__in={item[0] for item in items if item}
+            ).order_by('id').values_list('id', 'current_price', 'active', 'end_time', 'author_id')
+        }
+
+        results, bids = [], []
+        for item in items:
+            if item is None:
+                results.append({'listing_id': None, 'price': None, 'status': 'invalid'})
+                continue
+            listing_id, price = item
+            listing = listings.get(listing_id)
+            if listing is None:
+                status = 'not_found'
+            elif not listing['open']:
+                status = 'not_active'
+            elif listing['own']:
+                status = 'own_listing'
+            elif price <= listing['price']:
+                status = 'too_low'
+            else:
+                status = 'accepted'
+                listing['price'] = price
+                bids.append(Bid(price=price, user=user, listing_id=listing_id))
+            results.append({'listing_id': listing_id, 'price': price, 'status': status})
+        if not bids:
+            return results, {}
+
+        Bid.objects.bulk_create(bids)
+        leading = {bid.listing_id: bid for bid in bids}
+        Listing.objects.filter(pk__in=leading).update(
+            current_price = Case(*(When(pk=pk, then=Value(bid.price)) for pk, bid in leading.items())),
+            current_bidder = user,
+            bid_count = F('bid_count') + Case(*(When(pk=pk, then=Value(count)) for pk, count in Counter(bid.listing_id for bid in bids).items())),
+            end_time = Case(When(end_time__lt=soft_close_end, then=Value(soft_close_end)), default=F('end_time'))
+        )
+        invalidate_listing_fragments(*leading)
+        count_bulk_bids(list(leading))
+        for bid in bids:
+            record_event(bid.listing_id, 'bid')
+
+        answered = {
+            listing_id for listing_id, max_price in
+            ProxyBid.objects.filter(listing_id__in=leading).exclude(user=user).values_list('listing_id', 'max_price')
+            if max_price > leading[listing_id].price
+        }
+        for listing_id in sorted(answered):
+            leading[listing_id] = resolve_proxy_bids(leading[listing_id]) or leading[listing_id]
+        for result in results:
+            if result['status'] == 'accepted' and leading[result['listing_id']].user_id != user.id:
+                result['status'] = 'outbid'
+        return results, leading
+
+
+@retry_on_lock
+def open_listing(listing_data: dict, price: int) -> Listing:
+    """
+    create a listing with the author's starting price as its first bid, both or neither
+    """
+    with transaction.atomic():
+        listing = Listing.objects.create(**listing_data)
+        bid = Bid.objects.create(
+            price = price,
+            user = listing.author,
+            listing = listing
+        )
+        listing.record_bid(bid)
+    return listing
+
+
+def resolve_proxy_bids(bid: Bid) -> Bid | None:
+    """
+    answer a newly placed bid with the listing's proxy bids, in one pass\n
+    Every proxy above the price takes part at once, as if they all kept bidding one
+    BID_INCREMENT over each other until only one could afford it: the highest maximum wins
+    (the oldest proxy on a tie) and pays one increment over the runner-up, capped at its own
+    maximum. At most two bids are written, the runner-up's maximum and the winner's price, each
+    strictly above the previous one, so the history still follows Bid.is_valid_bid.\n
+    Must run inside accept_bid's transaction, after the listing row is locked.\n
+    Returns the new leading bid, None if no proxy had to bid
+    """
+    # the leader competes with its own proxy, or with the bid it just placed
+    leader_max, leader_order = bid.price, 0
+    challengers = []
+    for proxy_id, user_id, max_price in (
+        ProxyBid.objects.filter(listing_id=bid.listing_id, max_price__gt=bid.price).values_list('id', 'user_id', 'max_price')
+    ):
+        if user_id == bid.user_id:
+            leader_max, leader_order = max_price, proxy_id
+        else:
+            challengers.append((max_price, proxy_id, user_id))
+    if not challengers:
+        return None
+
+    contenders = sorted([(leader_max, leader_order, bid.user_id), *challengers], key=lambda contender: (-contender[0], contender[1]))
+    (winner_max, _, winner_id), (runner_up_max, _, runner_up_id) = contenders[:2]
+    price = min(winner_max, runner_up_max + settings.BID_INCREMENT)
+
+    bids = []
+    if bid.price < runner_up_max < price:
+        bids.append(Bid(price=runner_up_max, user_id=runner_up_id, listing_id=bid.listing_id))
+    if winner_id != bid.user_id or price > bid.price:
+        bids.append(Bid(price=price, user_id=winner_id, listing_id=bid.listing_id))
+    if not bids:
+        return None
+
+    # inserted one by one, not with bulk_create, so the ids keep the order they were placed in on every database
+    for auto_bid in bids:
+        auto_bid.save()
+    Listing.objects.filter(pk=bid.listing_id).update(
+        current_price = price,
+        current_bidder_id = winner_id,
+        bid_count = F('bid_count') + len(bids)
+    )
+    return bids[-1]
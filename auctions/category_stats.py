@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Category, Listing
+
+
+def invalidate_category_list():
+    """
+    drop the cached categories page once the current transaction commits
+    """
+    transaction.on_commit(lambda: cache.delete(make_template_fragment_key("category_list")))
+
+
+def _active_listings():
+    # listings of the category of the outer query, grouped so the aggregates below are per category
+    return Listing.objects.filter(category=OuterRef('pk'), active=True).order_by().values('category')
+
+
+def _highest_bid():
+    return Coalesce(Subquery(_active_listings().annotate(highest=Max('current_price')).values('highest')), 0)
+
+
+def count_listing_change(old: tuple | None, new: tuple | None):
+    """
+    move a listing's counts from its old state to its new one, Listing.category_stats_state
+    before and after a save (old None for a new listing, new None for a deleted one)\n
+    Counts are moved with F() so concurrent changes add up. highest_bid only goes up here,
+    except when the listing leaves the open auctions of a category while it may have held its
+    highest bid: that category's is computed again from its listings
+    """
+    if old == new:
+        return
+    counts = defaultdict(lambda: {'listing_count': 0, 'active_count': 0})
+    for state, sign in ((old, -1), (new, 1)):
+        if state and state[0]:
+            counts[state[0]]['listing_count'] += sign
+            counts[state[0]]['active_count'] += sign * state[1]
+
+    new_highest = new[2] if new and new[0] and new[1] else None
+    for category_id, delta in counts.items():
+        update = {field: F(field) + change for field, change in delta.items() if change}
+        if new_highest is not None and category_id == new[0]:
+            update['highest_bid'] = Greatest('highest_bid', Value(new_highest))
+        if old and old[1] and category_id == old[0] and not (new and new[1] and new[0] == old[0] and new[2] >= old[2]):
+            Category.objects.filter(pk=category_id, highest_bid__lte=old[2]).update(highest_bid=_highest_bid())
+        if update:
+            Category.objects.filter(pk=category_id).update(**update)
+    invalidate_category_list()
+
+
+def count_bid(listing_id: int, price: int):
+    """
+    raise the highest_bid of the listing's category to price, one query
+    """
+    Category.objects.filter(listings=listing_id).update(highest_bid=Greatest('highest_bid', Value(price)))
+    invalidate_category_list()
+
+
+def count_bulk_bids(listing_ids):
+    """
+    raise the highest_bid of the categories of listings whose current price was raised with
+    queryset.update(), like accept_bids does, one query
+    """
+    prices = Listing.objects.filter(category=OuterRef('pk'), pk__in=listing_ids, active=True).order_by().values('category')
+    Category.objects.filter(listings__in=listing_ids).update(
+        highest_bid=Greatest('highest_bid', Coalesce(Subquery(prices.annotate(highest=Max('current_price')).values('highest')), 0))
+    )
+    invalidate_category_list()
+
+
+def rebuild_category_stats(listing_ids=None) -> int:
+    """
+    compute the stats of every category from its listings, or only of the categories of
+    listing_ids, with one UPDATE\n
+    For changes made with queryset.update() or bulk_create, which send no signal, and to fix
+    counts by hand (manage.py rebuild_category_stats)\n
+    returns the number of categories updated
+    """
+    categories = Category.objects.all() if listing_ids is None else Category.objects.filter(listings__in=listing_ids)
+    listings = Listing.objects.filter(category=OuterRef('pk')).order_by().values('category')
+    updated = categories.update(
+        listing_count = Coalesce(Subquery(listings.annotate(count=Count('pk')).values('count')), 0),
+        active_count = Coalesce(Subquery(_active_listings().annotate(count=Count('pk')).values('count')), 0),
+        highest_bid = _highest_bid()
+    )
+    invalidate_category_list()
+    return updated
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    warn when rendered fragments are cached per process outside DEBUG: a bid evicts them from
+    the worker that took it only, the others keep serving the old price until FRAGMENT_CACHE_TIMEOUT
+    """
+    if settings.DEBUG or not isinstance(caches['default'], LocMemCache):
+        return []
+    return [Warning(
+        "The default cache is LocMemCache, each worker process keeps its own listing fragments.",
+        hint="Set CACHE_BACKEND to 'file' or 'redis' when serving with more than one worker, "
+             "or stale prices are served until FRAGMENT_CACHE_TIMEOUT.",
+        obj='CACHES',
+        id='auctions.W001',
+    )]
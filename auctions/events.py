@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.module_loading import import_string
+
+
+class Broker:
+    """
+    pub/sub interface the listing event stream is built on\n
+    publish() is called from sync views (any thread), subscribe() from async views on the ASGI loop.
+    Point settings.EVENT_BROKER at a subclass to fan events out across processes
+    """
+
+    def publish(self, channel: str, message: dict):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, heartbeat: float | None = None):
+        """
+        async iterator over the messages published on channel\n
+        None is yielded when `heartbeat` seconds pass without a message
+        """
+        raise NotImplementedError
+        yield
+
+    def subscriber_count(self, channel: str) -> int:
+        raise NotImplementedError
+
+
+class InProcessBroker(Broker):
+    """
+    deliver messages to the subscribers of this process only, one bounded queue each\n
+    A subscriber that falls more than `max_pending` messages behind misses the newest ones
+    instead of growing memory without limit
+    """
+
+    def __init__(self, max_pending: int = 100):
+        self.max_pending = max_pending
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, message: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, message)
+
+    async def subscribe(self, channel: str, heartbeat: float | None = None):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.max_pending))
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscriber)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+def _offer(queue: asyncio.Queue, message: dict):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+@lru_cache(maxsize=None)
+def get_broker() -> Broker:
+    return import_string(settings.EVENT_BROKER)()
+
+
+def listing_channel(listing_id: int) -> str:
+    return f"listing.{listing_id}"
+
+
+def publish_listing_event(listing_id: int, event: str, data: dict):
+    """
+    push an event to everyone watching a listing page\n
+    Examples:
+        publish_listing_event(3, 'bid', {'price': '7,589.54', 'bidder': 'hermione'})\n
+        publish_listing_event(3, 'state', {'active': False})
+    """
+    get_broker().publish(listing_channel(listing_id), {"event": event, "data": data})
+
+
+def format_sse(message: dict | None) -> bytes:
+    """
+    encode a broker message as a Server-Sent Event, None becomes a keep-alive comment
+    """
+    if message is None:
+        return b": keep-alive\n\n"
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n".encode()
+
+
+def serves_event_streams(request) -> bool:
+    """
+    whether the request came through the ASGI app, the only one listing_events can stream from\n
+    Under WSGI an endless stream would hold a worker thread for as long as the page is open
+    """
+    return isinstance(request, ASGIRequest)
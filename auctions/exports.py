@@ -0,0 +1,123 @@
+import csv
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Listing, Bid
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _closed_auctions():
+    # the winner's bid at the closing price, found through bid_listing_price_idx
+    winning_bid = Bid.objects.filter(listing=OuterRef('pk'), price=OuterRef('current_price'), user=OuterRef('winner'))
+    return Listing.objects.filter(active=False).order_by('id').values_list(
+        'id',
+        'title',
+        Coalesce('category__name', Value('')),
+        'author__username',
+        'date',
+        'end_time',
+        'bid_count',
+        Coalesce('winner__username', Value('')),
+        Coalesce('winner__email', Value('')),
+        Case(When(winner__isnull=False, then=F('current_price'))),
+        Subquery(winning_bid.values('date')[:1]),
+    )
+
+
+def _closed_auction_bids():
+    # highest first, the order of bid_listing_price_idx, so the database doesn't sort every listing's bids
+    return Bid.objects.filter(listing__active=False).order_by('listing_id', '-price').values_list(
+        'listing_id',
+        'id',
+        'user__username',
+        'price',
+        'date',
+        Case(When(Q(user=F('listing__winner'), price=F('listing__current_price')), then=Value(True)), default=Value(False)),
+    )
+
+
+# name: (columns, rows as values_list tuples in column order)
+EXPORTS = {
+    'auctions': (
+        ('listing_id', 'title', 'category', 'seller', 'created', 'ended', 'bids',
+         'winner', 'winner_email', 'winning_bid', 'winning_bid_at'),
+        _closed_auctions,
+    ),
+    'bids': (
+        ('listing_id', 'bid_id', 'bidder', 'amount', 'placed_at', 'winning'),
+        _closed_auction_bids,
+    ),
+}
+# columns holding cents, written as decimal amounts
+AMOUNT_COLUMNS = {'winning_bid', 'amount'}
+
+
+def _cleaner(columns: tuple):
+    amounts = [i for i, column in enumerate(columns) if column in AMOUNT_COLUMNS]
+
+    def clean(row: tuple) -> list:
+        row = [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for i in amounts:
+            if row[i] is not None:
+                dollars, cents = divmod(row[i], 100)
+                row[i] = f"{dollars}.{cents:02d}"
+        return row
+    return clean
+
+
+class _Echo:
+    # csv.writer writes a row into this and writerow() returns it
+    def write(self, value: str) -> str:
+        return value
+
+
+def export_rows(dataset: str, chunk_size: int | None = None):
+    """
+    the column names of an export, then its rows, read chunk_size (EXPORT_CHUNK_SIZE) at a time\n
+    The winner, seller and bidder names are joined by the database, so only one chunk of rows is
+    ever in memory however many auctions there are. Raises KeyError for an unknown dataset\n
+    Examples:
+        export_rows('auctions') -> ('listing_id', ...), [42, 'Telescope', 'Science', 'harry', '2026-10-01T09:00:00+00:00', ..., '7589.54', ...], ...\n
+        export_rows('bids') -> ('listing_id', 'bid_id', 'bidder', 'amount', 'placed_at', 'winning'), [42, 977, 'ron', '7589.54', ..., True], ...
+    """
+    columns, queryset = EXPORTS[dataset]
+    clean = _cleaner(columns)
+    yield columns
+    for row in queryset().iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE):
+        yield clean(row)
+
+
+def stream_export(dataset: str, export_format: str, chunk_size: int | None = None):
+    """
+    an export as CSV (with a header row) or JSON Lines, in pieces of chunk_size rows for
+    StreamingHttpResponse or a file\n
+    Examples:
+        stream_export('auctions', 'csv') -> 'listing_id,title,...\\r\\n42,Telescope,...\\r\\n', ...\n
+        stream_export('bids', 'jsonl') -> '{"listing_id": 42, "bid_id": 977, ...}\\n...', ...
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    rows = export_rows(dataset, chunk_size)
+    columns = next(rows)
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        format_row = writer.writerow
+        yield format_row(columns)
+    else:
+        format_row = lambda row: json.dumps(dict(zip(columns, row))) + "\n"
+
+    chunk = []
+    for row in rows:
+        chunk.append(format_row(row))
+        if len(chunk) == chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
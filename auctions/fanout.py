@@ -0,0 +1,60 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_QUERY_WORKERS, thread_name_prefix="async-query")
+        return _executor
+
+
+def _with_connection(func):
+    # what request_started/request_finished do for a request thread: drop connections that are broken or past CONN_MAX_AGE
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+async def run_query(func, *args, **kwargs):
+    """
+    run sync ORM code from an async view in one of ASYNC_QUERY_WORKERS threads, each with its own connection\n
+    The async ORM (aget, acount...) runs every query of every request on the one thread
+    asgiref keeps for thread sensitive code, so the queries of a page wait for each other and
+    for the other requests' ones. These threads don't share anything, the queries run at the
+    same time, as many as the database lets them.\n
+    The routing and metrics context of the request follows the call, like with sync_to_async
+    """
+    return await sync_to_async(_with_connection(func), thread_sensitive=False, executor=_get_executor())(*args, **kwargs)
+
+
+async def gather_queries(*funcs) -> list:
+    """
+    run independent pieces of sync ORM code concurrently, see run_query\n
+    Returns their results in order, the first exception is raised once they're all done\n
+    Example:
+        listing, comment_count = await gather_queries(
+            lambda: Listing.objects.get(pk=listing_id),
+            lambda: Comments.objects.filter(listing_id=listing_id).count(),
+        )
+    """
+    results = await asyncio.gather(*(run_query(func) for func in funcs), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
@@ -1,24 +1,55 @@
+import json
+from datetime import datetime
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
 class ListingNotActive(Exception):
     pass
 class BidTooLow(Exception):
     pass
+class MaxBidTooLow(Exception):
+    pass
+class BidOnOwnListing(Exception):
+    pass
 class ObjectAlreadyInDatabase(Exception):
     pass
+class InvalidEndTime(Exception):
+    pass
 
 def format_to_currency(num: str | int) -> str:
     """
-    format a num to currency format\n
-    Examples: 
-        '89' -> $ 0.89 \n
-        '758954' -> $ 7,589.54\n
-        'only_chars' -> $ 0.00
+    format a num to currency format, shared by views and the currency_format template filter\n
+    Examples:
+        '89' -> 0.89\n
+        '758954' -> 7,589.54\n
+        'only_chars' -> 0.00
     """
+    if isinstance(num, int):
+        return cached_format_cents(num)
+    try:
+        return cached_format_cents(int(format_string_as_int(str(num))))
+    except ValueError:
+        return cached_format_cents(0)
 
-    num = format_string_as_int(num)
-    num = put_cents(num)
-    num = put_comma_every_three_digits(num)
-      
-    return num
+def format_cents(cents: int) -> str:
+    """
+    format an amount of cents with a comma every three digits\n
+    Examples:
+        5 -> 0.05\n
+        758954 -> 7,589.54
+    """
+    dollars, cents = divmod(cents, 100)
+    return f"{dollars:,}.{cents:02d}"
+
+# prices repeat a lot across a page (and across pages), so keep the most recent ones formatted
+# (CURRENCY_FORMAT_CACHE_SIZE of them, 0 to format every time)
+if settings.CURRENCY_FORMAT_CACHE_SIZE:
+    cached_format_cents = lru_cache(maxsize=settings.CURRENCY_FORMAT_CACHE_SIZE)(format_cents)
+else:
+    cached_format_cents = format_cents
 
 def format_string_as_int(string: str) -> str:
     """
@@ -26,44 +57,71 @@ def format_string_as_int(string: str) -> str:
     A ValueError is raised if string is entirely non-numeric\n
     Examples:\n
         '$ 89.45' -> 8945\n
-        '0000' -> 0\n
+        '0000' -> raise ValueError\n
         '45bar64' -> 4564\n
         'foo' -> raise ValueError
     """
     if isinstance(string, int):
         return str(string)
 
-    num = ''
-    first_digit_found = False
-    for char in string:
-        if not first_digit_found and '1' <= char <= '9': 
-            first_digit_found = True
-        if first_digit_found and '0' <= char <= '9': 
-            num = ''.join((num, char))
+    num = ''.join(char for char in string if '0' <= char <= '9').lstrip('0')
     if not num: 
         raise ValueError('argument entirely non-numeric')
     return num
 
-def put_cents(num: str) -> str:
-    digits = len(num)
-    match digits:
-        case 1:
-            num = ''.join(('0.0', num))
-        case 2:
-            num = ''.join(('0.', num))
-        case _:
-            num = '.'.join((num[:-2], num[-2::]))
-    return num
+def parse_end_time(value: str) -> datetime | None:
+    """
+    read the end of an auction from a datetime-local input, in the site time zone\n
+    InvalidEndTime is raised if it isn't a date or is already past\n
+    Examples:
+        '' -> None\n
+        '2031-05-27T18:30' -> 2031-05-27 18:30:00-03:00
+    """
+    if not value:
+        return None
+    try:
+        end_time = parse_datetime(value)
+    except ValueError:
+        end_time = None
+    if end_time is None:
+        raise InvalidEndTime
+    if timezone.is_naive(end_time):
+        end_time = timezone.make_aware(end_time)
+    if end_time <= timezone.now():
+        raise InvalidEndTime
+    return end_time
 
-def put_comma_every_three_digits(num: str) -> str:
-    digits, DECIMAL_PLACES, MIN_DIGITS_TO_PUT_COMMA = len(num), 3, 4
-    if digits - DECIMAL_PLACES < MIN_DIGITS_TO_PUT_COMMA: return num
+def parse_bid_batch(body: bytes, content_type: str = '') -> list:
+    """
+    read a batch of bids, a JSON array or JSON lines (application/x-ndjson, application/jsonl), into
+    (listing_id, price) pairs, None for an item that isn't one\n
+    An item is [listing_id, price] or {"listing_id": id, "price": price}, price as an integer of
+    cents or a currency string, never a float. json.JSONDecodeError is raised for a body that
+    isn't JSON, ValueError if it isn't a list\n
+    Examples:
+        b'[[3, 7589], {"listing_id": 4, "price": "$ 12.50"}]' -> [(3, 7589), (4, 1250)]\n
+        b'[3, 7589]\\n[4, "foo"]' (JSON lines) -> [(3, 7589), None]\n
+        b'[[3, 12.5], [4, "$ 12.50"]]' -> [None, (4, 1250)]
+    """
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        items = [json.loads(line) for line in body.decode().splitlines() if line.strip()]
+    else:
+        items = json.loads(body)
+    if not isinstance(items, list):
+        raise ValueError('a batch of bids must be a list')
 
-    count = 0
-    formated_num = ''
-    for i in range(digits - DECIMAL_PLACES - 1, -1, -1):
-        if count % 3 == 0 and count != 0:
-            formated_num = ''.join(('.', formated_num))
-        formated_num = ''.join((num[i], formated_num))
-        count += 1
-    return ''.join((formated_num, num[-DECIMAL_PLACES::]))
\ No newline at end of file
+    bids = []
+    for item in items:
+        if isinstance(item, dict):
+            item = [item.get('listing_id'), item.get('price')]
+        try:
+            listing_id, price = item
+            if isinstance(listing_id, bool) or not isinstance(listing_id, int):
+                raise ValueError
+            # a JSON number with a fraction is neither cents nor a formatted price, 12.5 would read as 125
+            if isinstance(price, bool) or not isinstance(price, (int, str)):
+                raise ValueError
+            bids.append((listing_id, int(format_string_as_int(price))))
+        except (ValueError, TypeError):
+            bids.append(None)
+    return bids
@@ -0,0 +1,75 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Listing
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix="image-variants")
+
+
+def storage_name(picture: str) -> str:
+    """
+    name of a listing picture inside default_storage\n
+    Examples:
+        '/auctions/ai-images/ethereal_egg.png' -> ethereal_egg.png\n
+        '\\auctions\\ai-images\\death card.png' -> death card.png
+    """
+    return os.path.basename(str(picture).replace('\\', '/'))
+
+
+def schedule_image_variants(listing_id: int, name: str):
+    """
+    build the variants of a freshly uploaded picture on the worker pool once the listing is committed
+    """
+    transaction.on_commit(lambda: _executor.submit(_build_in_worker, listing_id, name))
+
+
+def _build_in_worker(listing_id: int, name: str):
+    try:
+        build_image_variants(listing_id, name)
+    except Exception:
+        logger.exception("could not build image variants of listing %s", listing_id)
+    finally:
+        connection.close()
+
+
+def build_image_variants(listing_id: int, name: str) -> dict:
+    """
+    downscale a listing picture to every size in IMAGE_VARIANTS as metadata-free WebP,
+    then record the variant urls on listing.image_variants
+    """
+    with default_storage.open(name) as original:
+        image = Image.open(original)
+        image.load()
+    # apply the camera rotation before EXIF is dropped
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    stem = os.path.splitext(name)[0]
+    variants = {}
+    for label, max_size in settings.IMAGE_VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail((max_size, max_size), Image.LANCZOS)
+        # a fresh info dict means no EXIF, XMP or ICC profile is written out
+        variant.info = {}
+        buffer = BytesIO()
+        variant.save(buffer, "WEBP", quality=settings.IMAGE_VARIANT_QUALITY, method=4)
+
+        path = default_storage.save(f"variants/{stem}-{label}.webp", ContentFile(buffer.getvalue()))
+        variants[label] = default_storage.url(path)
+
+    listing = Listing.objects.get(pk=listing_id)
+    listing.image_variants = variants
+    # save() rather than update() so the cached cards of the listing are evicted
+    listing.save(update_fields=["image_variants"])
+    return variants
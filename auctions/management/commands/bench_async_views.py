@@ -0,0 +1,169 @@
+import asyncio
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import clear_url_caches, reverse
+
+from auctions.models import User, Listing, Watchlist
+
+VIEWS = ("index", "listing_page", "watchlist")
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the read views with every query slowed down by --delay ms, as if the database were across a network: "
+        "first the sync views behind --workers WSGI threads, then the async ones on one event loop, "
+        "--concurrency clients at a time, and compare requests/s and latencies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="requests per view and per server")
+        parser.add_argument("--concurrency", type=int, default=100, help="clients waiting on the server at the same time")
+        parser.add_argument("--workers", type=int, default=8, help="WSGI worker threads")
+        parser.add_argument("--delay", type=float, default=5, help="ms added to every query")
+        parser.add_argument("--view", choices=VIEWS, action="append", help="repeat to run several, defaults to all")
+
+    def handle(self, *args, **options):
+        listing = Listing.objects.order_by("-id").first()
+        if listing is None:
+            raise CommandError("no listing to read, run seed_data first")
+        prefix = f"bench_async_views_{int(time.time())}"
+        user = User.objects.create_user(prefix)
+        Watchlist.objects.bulk_create(Watchlist(user=user, listing_id=pk) for pk in Listing.objects.values_list("id", flat=True)[:20])
+        paths = {
+            "index": reverse("index"),
+            "listing_page": reverse("listing_page", args=[listing.id]),
+            "watchlist": reverse("watchlist"),
+        }
+        login = Client()
+        login.force_login(user)
+        cookies = login.cookies
+
+        results = []
+        delay = options["delay"] / 1000
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]), slow_database(delay):
+                for view in options["view"] or VIEWS:
+                    with read_views(async_views=False):
+                        results.append((view, "sync WSGI", self.run_wsgi(paths[view], cookies, options)))
+                    with read_views(async_views=True):
+                        results.append((view, "async ASGI", asyncio.run(self.run_asgi(paths[view], cookies, options))))
+        finally:
+            User.objects.filter(username=prefix).delete()
+
+        self.stdout.write(
+            f"{options['requests']} requests per run, {options['concurrency']} concurrent clients, "
+            f"{options['workers']} WSGI threads, {settings.ASYNC_QUERY_WORKERS} async query threads, +{options['delay']}ms per query"
+        )
+        self.stdout.write(f"{'view':<14}{'server':<12}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for view, server, result in results:
+            self.stdout.write(
+                f"{view:<14}{server:<12}{result['throughput']:>8.0f}{result['p50'] * 1000:>9.1f}"
+                f"{result['p99'] * 1000:>9.1f}{result['errors']:>8}"
+            )
+
+    def run_wsgi(self, path: str, cookies, options: dict) -> dict:
+        """
+        a threaded WSGI server: the clients queue up for one of --workers threads, each blocked during its queries
+        """
+        workers = threading.BoundedSemaphore(options["workers"])
+        remaining = iter(range(options["requests"]))
+        timings, errors = [], []
+
+        def client_session():
+            client = Client()
+            client.cookies = cookies
+            try:
+                while next(remaining, None) is not None:
+                    start = time.perf_counter()
+                    with workers:
+                        status = client.get(path).status_code
+                    timings.append(time.perf_counter() - start)
+                    if status != 200:
+                        errors.append(status)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        clients = [threading.Thread(target=client_session) for _ in range(options["concurrency"])]
+        for client in clients: client.start()
+        for client in clients: client.join()
+        return summarize(timings, errors, time.perf_counter() - start)
+
+    async def run_asgi(self, path: str, cookies, options: dict) -> dict:
+        """
+        an ASGI server: every client's request is a coroutine on the same event loop
+        """
+        remaining = iter(range(options["requests"]))
+        timings, errors = [], []
+
+        async def client_session():
+            client = AsyncClient()
+            client.cookies = cookies
+            while next(remaining, None) is not None:
+                start = time.perf_counter()
+                status = (await client.get(path)).status_code
+                timings.append(time.perf_counter() - start)
+                if status != 200:
+                    errors.append(status)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_session() for _ in range(options["concurrency"])))
+        return summarize(timings, errors, time.perf_counter() - start)
+
+
+def summarize(timings: list, errors: list, elapsed: float) -> dict:
+    latencies = sorted(timings)
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] if latencies else 0,
+        "p99": latencies[int(len(latencies) * 0.99)] if latencies else 0,
+        "errors": len(errors),
+    }
+
+
+@contextmanager
+def slow_database(delay: float):
+    """
+    sleep `delay` seconds before every query of every connection opened in the block, the GIL is released meanwhile
+    """
+    def slow_query(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(slow_query)
+
+    connections.close_all()
+    connection_created.connect(install)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        connections.close_all()
+
+
+@contextmanager
+def read_views(async_views: bool):
+    """
+    route the read views to their sync or async variants, urls.py picks them when it's imported
+    """
+    def reload_urls():
+        importlib.reload(importlib.import_module("auctions.urls"))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    try:
+        with override_settings(ASYNC_READ_VIEWS=async_views):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
@@ -0,0 +1,74 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.db.models import Count, Max
+
+from auctions.bidding import accept_bid
+from auctions.helpers import BidTooLow
+from auctions.models import User, Listing, Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a single listing with concurrent bidders through the bid engine and check no bid was lost. "
+        "Runs against the default database: db.sqlite3, or PostgreSQL when POSTGRES_DB is set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--bids", type=int, default=200, help="bids per thread")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        threads, bids_per_thread = options["threads"], options["bids"]
+        prefix = f"bench_bids_{int(time.time())}"
+        bidders = [User.objects.create_user(f"{prefix}_{i}") for i in range(threads)]
+        listing = Listing.objects.create(title="bench_bids", author=User.objects.create_user(f"{prefix}_author"))
+        accepted, rejected, locked = [0] * threads, [0] * threads, [0] * threads
+
+        def bid_war(i):
+            rng = random.Random(options["seed"] + i)
+            try:
+                for _ in range(bids_per_thread):
+                    # bid slightly above what this thread last saw, like a real bidder would
+                    price = Listing.objects.values_list("current_price", flat=True).get(pk=listing.pk) + rng.randint(1, 100)
+                    try:
+                        accept_bid(listing.pk, bidders[i], price)
+                        accepted[i] += 1
+                    except BidTooLow:
+                        rejected[i] += 1
+                    except OperationalError:
+                        locked[i] += 1
+            finally:
+                connection.close()
+
+        try:
+            workers = [threading.Thread(target=bid_war, args=(i,)) for i in range(threads)]
+            start = time.perf_counter()
+            for worker in workers: worker.start()
+            for worker in workers: worker.join()
+            elapsed = time.perf_counter() - start
+
+            listing.refresh_from_db()
+            stats = Bid.objects.filter(listing=listing).aggregate(count=Count("pk"), max_price=Max("price"))
+            duplicated_prices = (
+                Bid.objects.filter(listing=listing).values("price").annotate(n=Count("pk")).filter(n__gt=1).count()
+            )
+
+            self.stdout.write(f"{connection.vendor}: {threads} threads x {bids_per_thread} bids in {elapsed:.2f}s")
+            self.stdout.write(f"  accepted {sum(accepted)}, rejected as stale {sum(rejected)}, lock errors {sum(locked)}")
+            self.stdout.write(f"  {(sum(accepted) + sum(rejected)) / elapsed:.0f} bids/s processed")
+
+            if stats["count"] != sum(accepted) or stats["count"] != listing.bid_count:
+                raise CommandError(f"lost bids: {sum(accepted)} accepted, {stats['count']} stored, bid_count {listing.bid_count}")
+            if stats["max_price"] != listing.current_price:
+                raise CommandError(f"current price {listing.current_price} is not the highest bid {stats['max_price']}")
+            if duplicated_prices:
+                raise CommandError(f"{duplicated_prices} prices were accepted more than once")
+            self.stdout.write(self.style.SUCCESS("  no lost or duplicated bids"))
+        finally:
+            listing.delete()
+            User.objects.filter(username__startswith=prefix).delete()
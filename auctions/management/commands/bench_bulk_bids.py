@@ -0,0 +1,97 @@
+import json
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Max
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from auctions.models import User, Listing, Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the same bids through place_bid, one request each, then through place_bid_bulk in batches, "
+        "and compare bids/s over the whole request path. Checks every listing's price and bid count afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bids", type=int, default=5_000, help="bids per mode")
+        parser.add_argument("--listings", type=int, default=500)
+        parser.add_argument("--batch-size", type=int, default=settings.BID_BATCH_MAX)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        prefix = f"bench_bulk_bids_{int(time.time())}"
+        author, bidder = User.objects.create_user(f"{prefix}_author"), User.objects.create_user(f"{prefix}_bidder")
+        client = Client()
+        client.force_login(bidder)
+
+        results = []
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                for mode in ("single", "bulk"):
+                    listings = Listing.objects.bulk_create(
+                        Listing(title=prefix[:30], author=author, current_price=0) for _ in range(options["listings"])
+                    )
+                    bids = self.make_bids([listing.pk for listing in listings], options)
+                    start = time.perf_counter()
+                    accepted = self.send_single(client, bids) if mode == "single" else self.send_bulk(client, bids, options["batch_size"])
+                    results.append((mode, accepted, time.perf_counter() - start))
+                    self.verify(listings, accepted)
+        finally:
+            Listing.objects.filter(author=author).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+        self.stdout.write(f"{options['bids']} bids on {options['listings']} listings, batches of {options['batch_size']}")
+        self.stdout.write(f"{'':<8}{'accepted':>10}{'seconds':>9}{'bids/s':>9}")
+        for mode, accepted, elapsed in results:
+            self.stdout.write(f"{mode:<8}{accepted:>10}{elapsed:>9.2f}{options['bids'] / elapsed:>9.0f}")
+        self.stdout.write(self.style.SUCCESS("prices and bid counts match the accepted bids"))
+
+    def make_bids(self, listing_ids: list, options: dict) -> list:
+        """
+        rising prices per listing, with some stale ones that must be rejected
+        """
+        rng = random.Random(options["seed"])
+        prices = dict.fromkeys(listing_ids, 0)
+        bids = []
+        for _ in range(options["bids"]):
+            listing_id = rng.choice(listing_ids)
+            if rng.random() < 0.1:
+                bids.append([listing_id, prices[listing_id]])
+            else:
+                prices[listing_id] += rng.randint(1, 500)
+                bids.append([listing_id, prices[listing_id]])
+        return bids
+
+    def send_single(self, client: Client, bids: list) -> int:
+        accepted = 0
+        for listing_id, price in bids:
+            response = client.post(reverse("place_bid", args=[listing_id]), {"bid": price}, content_type="application/json")
+            accepted += response.status_code == 200
+        return accepted
+
+    def send_bulk(self, client: Client, bids: list, batch_size: int) -> int:
+        accepted = 0
+        for i in range(0, len(bids), batch_size):
+            response = client.post(reverse("place_bid_bulk"), json.dumps(bids[i:i + batch_size]), content_type="application/json")
+            if response.status_code != 200:
+                raise CommandError(f"place_bid_bulk answered {response.status_code}: {response.content[:200]}")
+            accepted += sum(result["status"] == "accepted" for result in response.json()["results"])
+        return accepted
+
+    def verify(self, listings: list, accepted: int):
+        stored = Bid.objects.filter(listing__in=listings).count()
+        if stored != accepted:
+            raise CommandError(f"{accepted} bids accepted but {stored} stored")
+        wrong = [
+            pk for pk, price, bid_count, highest, count in Listing.objects.filter(pk__in=[listing.pk for listing in listings])
+            .annotate(highest=Max("bids__price"), count=Count("bids")).values_list("pk", "current_price", "bid_count", "highest", "count")
+            if bid_count != count or (price != highest and highest is not None)
+        ]
+        if wrong:
+            raise CommandError(f"{len(wrong)} listings have a price or bid count that doesn't match their bids")
@@ -0,0 +1,73 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.helpers import format_to_currency, format_cents
+
+
+def legacy_format_to_currency(num: str) -> str:
+    """
+    the character-by-character formatter the views and the template filter used before,
+    kept here only as the benchmark baseline
+    """
+    num = str(num)
+    digits = ''
+    first_digit_found = False
+    for char in num:
+        if not first_digit_found and '1' <= char <= '9':
+            first_digit_found = True
+        if first_digit_found and '0' <= char <= '9':
+            digits = ''.join((digits, char))
+    num = digits or '0'
+
+    match len(num):
+        case 1:
+            num = ''.join(('0.0', num))
+        case 2:
+            num = ''.join(('0.', num))
+        case _:
+            num = '.'.join((num[:-2], num[-2::]))
+
+    digits, DECIMAL_PLACES, MIN_DIGITS_TO_PUT_COMMA = len(num), 3, 4
+    if digits - DECIMAL_PLACES < MIN_DIGITS_TO_PUT_COMMA: return num
+    count = 0
+    formated_num = ''
+    for i in range(digits - DECIMAL_PLACES - 1, -1, -1):
+        if count % 3 == 0 and count != 0:
+            formated_num = ''.join((',', formated_num))
+        formated_num = ''.join((num[i], formated_num))
+        count += 1
+    return ''.join((formated_num, num[-DECIMAL_PLACES::]))
+
+
+class Command(BaseCommand):
+    help = "Compare the legacy currency formatter with the integer one (uncached and memoized) on random prices."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--values", type=int, default=1_000_000)
+        parser.add_argument("--distinct", type=int, default=5_000, help="distinct prices, pages repeat the same few")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        prices = [rng.randint(1, 10**12) for _ in range(options["distinct"])]
+        values = [rng.choice(prices) for _ in range(options["values"])]
+
+        for value in prices[:1000]:
+            assert legacy_format_to_currency(value) == format_cents(value) == format_to_currency(value), value
+
+        results = {}
+        for name, formatter in (
+            ("legacy", legacy_format_to_currency),
+            ("integer", format_cents),
+            ("integer + memo", format_to_currency),
+        ):
+            start = time.perf_counter()
+            for value in values:
+                formatter(value)
+            results[name] = time.perf_counter() - start
+
+        for name, elapsed in results.items():
+            speedup = results["legacy"] / elapsed
+            self.stdout.write(f"{name:<15} {elapsed:7.3f}s  {len(values) / elapsed:>12,.0f} values/s  x{speedup:.1f}")
@@ -0,0 +1,95 @@
+import asyncio
+import resource
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from auctions.events import get_broker, listing_channel, publish_listing_event
+from auctions.models import Listing
+
+
+class Command(BaseCommand):
+    help = (
+        "Open thousands of idle listing event streams on the ASGI app in this single process, "
+        "publish bids from another thread and report how long the fan-out takes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=5_000)
+        parser.add_argument("--bids", type=int, default=10)
+        parser.add_argument("--listing", type=int, help="listing id, defaults to the newest one")
+
+    def handle(self, *args, **options):
+        listing = Listing.objects.get(pk=options["listing"]) if options["listing"] else Listing.objects.order_by("-id").first()
+        if listing is None:
+            raise CommandError("no listing to subscribe to")
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            asyncio.run(self.run(listing.id, options["subscribers"], options["bids"]))
+
+    async def run(self, listing_id: int, subscribers: int, bids: int):
+        from commerce.asgi import application
+
+        path = reverse("listing_events", args=[listing_id])
+        received = [0] * subscribers
+        all_received = asyncio.Event()
+        disconnect = asyncio.Event()
+        expected = 0
+
+        def connection(i):
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+                "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+                "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 10_000 + i), "server": ("testserver", 80),
+            }
+            request_sent = False
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                if message["type"] == "http.response.body" and message.get("body", b"").startswith(b"event: bid"):
+                    received[i] += 1
+                    if received[i] == expected and all(count == expected for count in received):
+                        all_received.set()
+
+            return application(scope, receive, send)
+
+        broker, channel = get_broker(), listing_channel(listing_id)
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(connection(i)) for i in range(subscribers)]
+        while broker.subscriber_count(channel) < subscribers:
+            await asyncio.sleep(0.05)
+        connect_time = time.perf_counter() - start
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(f"{subscribers} idle subscribers connected in {connect_time:.2f}s, max RSS {rss_mb:.0f} MB")
+
+        latencies = []
+        for bid in range(bids):
+            all_received.clear()
+            expected = bid + 1
+            start = time.perf_counter()
+            # publish from another thread, like a sync place_bid view would
+            threading.Thread(target=publish_listing_event, args=(listing_id, "bid", {"price": str(bid), "bidder": "bench"})).start()
+            await asyncio.wait_for(all_received.wait(), timeout=30)
+            latencies.append(time.perf_counter() - start)
+
+        latencies.sort()
+        self.stdout.write(
+            f"fan-out of {bids} bids to {subscribers} subscribers: "
+            f"median {latencies[len(latencies) // 2] * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms"
+        )
+
+        disconnect.set()
+        await asyncio.wait(tasks, timeout=30)
+        for task in tasks:
+            task.cancel()
+        self.stdout.write(f"{broker.subscriber_count(channel)} subscribers left after disconnect")
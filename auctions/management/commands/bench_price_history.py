@@ -0,0 +1,72 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from auctions import price_history
+from auctions.models import User, Listing, Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a listing with a long bidding war and time its price_history endpoint, cold and cached, "
+        "and the downsampling alone with and without NumPy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bids", type=int, default=100_000)
+        parser.add_argument("--points", type=int, default=settings.PRICE_HISTORY_POINTS)
+        parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the best one is kept")
+
+    def handle(self, *args, **options):
+        prefix = f"bench_price_history_{int(time.time())}"
+        bidders = [User.objects.create_user(f"{prefix}_{i}") for i in range(2)]
+        listing = Listing.objects.create(title=prefix[:30], author=bidders[0])
+        Bid.objects.bulk_create(
+            (Bid(price=100 + i, user=bidders[i % 2], listing=listing) for i in range(options["bids"])), batch_size=10_000
+        )
+        Listing.objects.filter(pk=listing.pk).update(current_price=100 + options["bids"] - 1, bid_count=options["bids"])
+
+        path = f"{reverse('price_history', args=[listing.id])}?points={options['points']}"
+        client = Client()
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                # a timeout of 0 expires the series as soon as it's stored
+                with override_settings(PRICE_HISTORY_CACHE_TIMEOUT=0):
+                    cold_time, response = best_of(options["repeat"], lambda: client.get(path))
+                cached_time, _ = best_of(options["repeat"], lambda: client.get(path))
+
+            rows = Bid.objects.filter(listing=listing).order_by("price").values_list(price_history.Epoch("date"), "price")
+            times, prices = zip(*rows)
+            numpy = price_history.numpy
+            try:
+                price_history.numpy = None
+                python_time, _ = best_of(options["repeat"], lambda: price_history.downsample(times, prices, options["points"]))
+            finally:
+                price_history.numpy = numpy
+            numpy_time = best_of(options["repeat"], lambda: price_history.downsample(times, prices, options["points"]))[0] if numpy else None
+        finally:
+            listing.delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+        series = response.json()
+        self.stdout.write(f"{series['bids']} bids -> {len(series['points'])} points, {len(response.content) / 1024:.1f} KiB of JSON")
+        self.stdout.write(f"  endpoint, cold cache      {cold_time * 1000:>8.1f} ms")
+        self.stdout.write(f"  endpoint, cached          {cached_time * 1000:>8.1f} ms")
+        self.stdout.write(f"  downsample, pure Python   {python_time * 1000:>8.1f} ms")
+        if numpy_time is None:
+            self.stdout.write("  downsample, NumPy         not installed")
+        else:
+            self.stdout.write(f"  downsample, NumPy         {numpy_time * 1000:>8.1f} ms")
+
+
+def best_of(repeat: int, func) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
@@ -0,0 +1,115 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.bidding import accept_bid
+from auctions.helpers import BidTooLow, format_cents
+from auctions.models import User, Listing, Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate bidding wars with and without proxy bids and compare the place_bid requests they take. "
+        "Without proxies every outbid bidder comes back for one more increment until the price passes what they'd pay, "
+        "with proxies each bidder posts their maximum once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wars", type=int, default=10)
+        parser.add_argument("--bidders", type=int, default=10, help="bidders per war")
+        parser.add_argument("--max-price", type=int, default=50_000, help="highest valuation a bidder can have, in cents")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        prefix = f"bench_proxy_bids_{int(time.time())}"
+        bidders = [User.objects.create_user(f"{prefix}_{i}") for i in range(options["bidders"])]
+        self.author = User.objects.create_user(f"{prefix}_author")
+        rng = random.Random(options["seed"])
+        wars = [
+            {user.pk: rng.randint(settings.BID_INCREMENT, options["max_price"]) for user in bidders}
+            for _ in range(options["wars"])
+        ]
+        try:
+            manual = self.run(bidders, wars, self.manual_war, options["seed"])
+            proxy = self.run(bidders, wars, self.proxy_war, options["seed"])
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+        self.stdout.write(f"{options['wars']} wars of {options['bidders']} bidders, {settings.BID_INCREMENT} cents increment")
+        self.stdout.write(f"{'':<10}{'requests':>10}{'bids':>8}{'final prices':>14}{'seconds':>9}")
+        for name, result in (("manual", manual), ("proxy", proxy)):
+            self.stdout.write(
+                f"{name:<10}{result['requests']:>10}{result['bids']:>8}{format_cents(result['revenue']):>14}{result['elapsed']:>9.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"proxy bidding took {manual['requests'] / proxy['requests']:.1f}x fewer requests"))
+
+    def run(self, bidders: list, wars: list, war, seed: int) -> dict:
+        requests, bids, revenue, elapsed = 0, 0, 0, 0.0
+        for number, valuations in enumerate(wars):
+            listing = Listing.objects.create(title="bench_proxy_bids", author=self.author)
+            try:
+                start = time.perf_counter()
+                requests += war(listing, bidders, valuations, random.Random(seed + number))
+                elapsed += time.perf_counter() - start
+                bids += self.check_war(listing, valuations)
+                revenue += listing.current_price
+            finally:
+                listing.delete()
+        return {"requests": requests, "bids": bids, "revenue": revenue, "elapsed": elapsed}
+
+    def manual_war(self, listing, bidders: list, valuations: dict, rng: random.Random) -> int:
+        """
+        bidders come back in random order and bid one increment over the price while they can afford it
+        """
+        requests, bidding = 0, True
+        while bidding:
+            bidding = False
+            for user in rng.sample(bidders, len(bidders)):
+                price = Listing.objects.values_list("current_price", flat=True).get(pk=listing.pk) + settings.BID_INCREMENT
+                if listing_leader(listing) == user.pk or price > valuations[user.pk]:
+                    continue
+                requests += 1
+                try:
+                    accept_bid(listing.pk, user, price)
+                    bidding = True
+                except BidTooLow:
+                    pass
+        return requests
+
+    def proxy_war(self, listing, bidders: list, valuations: dict, rng: random.Random) -> int:
+        """
+        bidders arrive in random order and post one increment over the price with their valuation as maximum
+        """
+        requests = 0
+        for user in rng.sample(bidders, len(bidders)):
+            price = Listing.objects.values_list("current_price", flat=True).get(pk=listing.pk) + settings.BID_INCREMENT
+            if listing_leader(listing) == user.pk or price > valuations[user.pk]:
+                continue
+            requests += 1
+            try:
+                accept_bid(listing.pk, user, price, valuations[user.pk])
+            except BidTooLow:
+                pass
+        return requests
+
+    def check_war(self, listing, valuations: dict) -> int:
+        """
+        every bid in the history beats the one before it, and the winner values the item the most\n
+        (give or take an increment, a bidder can't go over their valuation to answer a bid just under it)
+        """
+        listing.refresh_from_db()
+        prices = list(Bid.objects.filter(listing=listing).order_by("id").values_list("price", flat=True))
+        if any(previous >= price for previous, price in zip(prices, prices[1:])):
+            raise CommandError(f"bid history of listing {listing.pk} isn't increasing: {prices}")
+        if len(prices) != listing.bid_count or (prices and prices[-1] != listing.current_price):
+            raise CommandError(f"listing {listing.pk} snapshot doesn't match its bids")
+        highest = max(valuations.values())
+        if listing.current_bidder_id is not None and valuations[listing.current_bidder_id] + settings.BID_INCREMENT <= highest:
+            raise CommandError(f"listing {listing.pk} was won below the highest valuation")
+        return len(prices)
+
+
+def listing_leader(listing) -> int | None:
+    return Listing.objects.values_list("current_bidder_id", flat=True).get(pk=listing.pk)
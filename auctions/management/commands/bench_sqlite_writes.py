@@ -0,0 +1,110 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from auctions.bidding import accept_bid
+from auctions.helpers import BidTooLow
+from auctions.models import User, Listing, Comments
+from auctions.retry import is_lock_error, retry_on_lock
+
+# what Django uses when DATABASES has no OPTIONS: rollback journal, deferred transactions, 5s busy timeout
+BASELINE_PROFILE = {
+    "CONN_MAX_AGE": 0,
+    "CONN_HEALTH_CHECKS": False,
+    "OPTIONS": {},
+}
+# the journal mode is stored in the database file, it's set once before each run
+JOURNAL_MODES = {"baseline": "DELETE", "tuned": "WAL"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent bids and comments against db.sqlite3, first with Django's default SQLite setup and no "
+        "retries, then with SQLITE_PROFILE and retry_on_lock, and compare writes/s and lock errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--listings", type=int, default=4, help="listings the threads bid on, fewer means more contention")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("this benchmark compares SQLite setups, the default database isn't SQLite")
+
+        prefix = f"bench_sqlite_writes_{int(time.time())}"
+        users = [User.objects.create_user(f"{prefix}_{i}") for i in range(options["threads"])]
+        author = User.objects.create_user(f"{prefix}_author")
+        listings = [Listing.objects.create(title=prefix[:30], author=author) for _ in range(options["listings"])]
+        database = connections.settings["default"]
+        tuned = {key: database[key] for key in BASELINE_PROFILE}
+        try:
+            results = {}
+            for name, profile, write in (
+                ("baseline", BASELINE_PROFILE, lambda func: func),
+                ("tuned", tuned, retry_on_lock),
+            ):
+                connections.close_all()
+                database.update(profile)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"PRAGMA journal_mode={JOURNAL_MODES[name]}")
+                results[name] = self.run(users, listings, write, options)
+        finally:
+            connections.close_all()
+            database.update(tuned)
+            Listing.objects.filter(pk__in=[listing.pk for listing in listings]).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+        self.stdout.write(f"{options['threads']} threads on {options['listings']} listings for {options['seconds']}s each")
+        self.stdout.write(f"{'':<10}{'writes':>8}{'writes/s':>10}{'lock errors':>13}{'p99 ms':>9}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<10}{result['writes']:>8}{result['writes'] / options['seconds']:>10.0f}"
+                f"{result['locked']:>13}{result['p99'] * 1000:>9.1f}"
+            )
+
+    def run(self, users: list, listings: list, write, options: dict) -> dict:
+        """
+        each thread plays a user alternating between bidding (read the price, then bid over it) and commenting
+        """
+        place_bid, add_comment = write(accept_bid.__wrapped__), write(Comments.objects.create)
+        writes, locked, timings = [0] * len(users), [0] * len(users), [[] for _ in users]
+        deadline = time.perf_counter() + options["seconds"]
+
+        def user_session(i):
+            rng = random.Random(options["seed"] + i)
+            try:
+                while time.perf_counter() < deadline:
+                    listing = rng.choice(listings)
+                    start = time.perf_counter()
+                    try:
+                        if rng.random() < 0.7:
+                            price = Listing.objects.values_list("current_price", flat=True).get(pk=listing.pk)
+                            place_bid(listing.pk, users[i], price + rng.randint(1, 100))
+                        else:
+                            add_comment(text="benchmark", user=users[i], listing=listing)
+                        writes[i] += 1
+                    except BidTooLow:
+                        pass
+                    except OperationalError as error:
+                        if not is_lock_error(error):
+                            raise
+                        locked[i] += 1
+                    timings[i].append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=user_session, args=(i,)) for i in range(len(users))]
+        for worker in workers: worker.start()
+        for worker in workers: worker.join()
+        latencies = sorted(timing for thread in timings for timing in thread)
+        return {
+            "writes": sum(writes),
+            "locked": sum(locked),
+            "p99": latencies[int(len(latencies) * 0.99)] if latencies else 0,
+        }
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from auctions.images import build_image_variants, storage_name
+from auctions.models import Listing
+
+
+class Command(BaseCommand):
+    help = "Build the WebP thumbnail/display variants of listings that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="rebuild variants of every listing")
+
+    def handle(self, *args, **options):
+        listings = Listing.objects.exclude(picture="").exclude(picture=None).only("id", "picture")
+        if not options["all"]:
+            listings = listings.filter(image_variants={})
+
+        for listing in listings.iterator():
+            try:
+                variants = build_image_variants(listing.id, storage_name(listing.picture))
+            except (OSError, ValueError) as e:
+                self.stderr.write(f"listing {listing.id}: {e}")
+                continue
+            self.stdout.write(f"listing {listing.id}: {', '.join(variants)}")
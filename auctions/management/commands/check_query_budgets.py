@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from auctions.metrics import query_budget, QueryBudgetExceeded
+from auctions.models import User, Listing, Category, Watchlist, Bid, Comments
+
+# max SQL queries per view, including the user lookup done by the middlewares
+# (the session itself comes from the cache or the cookie, see SESSION_STORAGE)
+QUERY_BUDGETS = {
+    "index": 2,
+    "category": 3,
+    "listing_page": 5,
+    "comment_page": 1,
+    "watchlist": 3,
+    # plus the trending leaderboard, read from the table by a process's first request
+    "trending": 3,
+    # they look up the proxy bids that could answer the bid and raise the category's highest bid
+    "place_bid": 7,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed datasets of increasing size and fail if index, category, listing_page, comment_page, watchlist, "
+        "trending or place_bid run more SQL queries than their budget. Seeded rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 100_000], help="listings per dataset")
+
+    def handle(self, *args, **options):
+        failures = []
+        for size in options["sizes"]:
+            try:
+                with transaction.atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                    failures += self.check_budgets(size)
+                    raise Rollback
+            except Rollback:
+                pass
+        if failures:
+            raise CommandError("\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("all views within their query budget"))
+
+    def check_budgets(self, size: int) -> list:
+        user, listing, category = seed_budget_data(size)
+        client = Client()
+        client.force_login(user)
+        requests = {
+            "index": lambda: client.get(reverse("index")),
+            "category": lambda: client.get(reverse("category", args=[category.id])),
+            "listing_page": lambda: client.get(reverse("listing_page", args=[listing.id])),
+            "comment_page": lambda: client.get(reverse("comment_page", args=[listing.id])),
+            "watchlist": lambda: client.get(reverse("watchlist")),
+            "trending": lambda: client.get(reverse("trending")),
+            "place_bid": lambda: client.post(
+                reverse("place_bid", args=[listing.id]), {"bid": str(listing.current_price + 1)}, content_type="application/json"
+            ),
+        }
+
+        failures = []
+        for view, request in requests.items():
+            try:
+                with query_budget(QUERY_BUDGETS[view]) as captured:
+                    response = request()
+                status = self.style.SUCCESS("ok")
+            except QueryBudgetExceeded as e:
+                failures.append(f"{view} with {size} listings: {e}")
+                status = self.style.ERROR("over budget")
+            if response.status_code != 200:
+                failures.append(f"{view} with {size} listings answered {response.status_code}")
+            self.stdout.write(f"{size:>8} listings  {view:<13} {len(captured):>3}/{QUERY_BUDGETS[view]} queries  {status}")
+        return failures
+
+
+def seed_budget_data(size: int):
+    """
+    `size` listings of another user in one category, the newest with a bid of the user, 50 of
+    them watched by the user and up to 5000 comments, shared with auctions/tests/test_query_budgets.py\n
+    returns (user, newest listing, category)
+    """
+    user = User.objects.create_user("query_budget_user")
+    author = User.objects.create_user("query_budget_author")
+    category = Category.objects.create(name="query_budget")
+    Listing.objects.bulk_create(
+        (Listing(title=f"listing {i}", author=author, category=category, current_price=100 + i, current_bidder=user, bid_count=1)
+         for i in range(size)),
+        batch_size=2_000,
+    )
+    listings = list(Listing.objects.filter(category=category).order_by("-id")[:50])
+    listing = listings[0]
+    Bid.objects.create(price=listing.current_price, user=user, listing=listing)
+    Watchlist.objects.bulk_create(Watchlist(user=user, listing=item) for item in listings)
+    Comments.objects.bulk_create(Comments(text=f"comment {i}", user=user, listing=listing) for i in range(min(size, 5_000)))
+    return user, listing, category
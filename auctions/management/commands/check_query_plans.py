@@ -0,0 +1,103 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from auctions.models import Listing, Watchlist, Bid, Comments, ProxyBid, TrendingScore
+
+# plan lines that mean every row of a table is read, or every matching row is sorted
+FULL_SCAN = {
+    "sqlite": re.compile(r"\bSCAN \w+$|USE TEMP B-TREE FOR ORDER BY"),
+    "postgresql": re.compile(r"Seq Scan on \w+|Sort Key"),
+}
+INDEX_USED = {
+    "sqlite": re.compile(r"USING (?:COVERING )?INDEX (\w+)"),
+    "postgresql": re.compile(r"Index (?:Only )?Scan(?: Backward)? using (\w+)"),
+}
+
+# indexes that serve a query as well as the one meant for it
+EQUIVALENT_INDEXES = {
+    # the FK index (user_id) holds rowids in order, so it serves "user = ? ORDER BY id DESC" too
+    "watchlist_user_id_idx": {"auctions_watchlist_user_id_f08ae6f3"},
+    # SQLite names the index of a UNIQUE constraint itself
+    "watchlist_user_listing_unique": {"sqlite_autoindex_auctions_watchlist_1"},
+    # listing_id leads both, the FK index is smaller
+    "proxybid_listing_user_unique": {"auctions_proxybid_listing_id_0d7a2d2e", "sqlite_autoindex_auctions_proxybid_1"},
+}
+
+
+def hot_queries() -> dict:
+    """
+    name: (queryset, index meant for it), shared with auctions/tests/test_query_plans.py\n
+    The planner may pick an equivalent one, see EQUIVALENT_INDEXES
+    """
+    page = settings.LISTINGS_PAGE_SIZE + 1
+    now = timezone.now()
+    return {
+        "index feed": (Listing.objects.filter(active=True).order_by("-date", "-id")[:page], "listing_active_date_id_idx"),
+        "index feed, next page": (
+            Listing.objects.filter(Q(date__lt=now) | Q(date=now, id__lt=1), active=True).order_by("-date", "-id")[:page],
+            "listing_active_date_id_idx",
+        ),
+        "category feed": (Listing.objects.filter(category=1).order_by("-date", "-id")[:page], "listing_category_date_id_idx"),
+        "latest bid": (Bid.objects.filter(listing=1).order_by("-price")[:1], "bid_listing_price_idx"),
+        "highest bid": (Bid.objects.filter(listing=1).values("listing").annotate(max_bid=Max("price")), "bid_listing_price_idx"),
+        "listing comments": (Comments.objects.filter(listing=1).order_by("-date", "-id"), "comments_listing_date_id_idx"),
+        "watchlist page": (Watchlist.objects.filter(user=1).order_by("-id")[:page], "watchlist_user_id_idx"),
+        "in watchlist": (Watchlist.objects.filter(user=1, listing=1), "watchlist_user_listing_unique"),
+        "proxy bids": (ProxyBid.objects.filter(listing=1, max_price__gt=100), "proxybid_listing_user_unique"),
+        "trending leaderboard": (
+            TrendingScore.objects.order_by("-score")[:settings.TRENDING_CAPACITY], "trendingscore_score_idx"
+        ),
+        "auction deadlines": (
+            Listing.objects.filter(active=True, end_time__isnull=False).order_by("end_time"), "listing_open_end_time_idx"
+        ),
+    }
+
+
+def explain(queryset) -> str:
+    if connection.vendor == "postgresql":
+        # tiny development tables are cheaper to read whole, ask the planner what it does once they aren't
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
+    return queryset.explain()
+
+
+def full_scans(plan: str) -> list:
+    return [line.strip() for line in plan.splitlines() if FULL_SCAN[connection.vendor].search(line.strip())]
+
+
+def indexes_used(plan: str) -> list:
+    return INDEX_USED[connection.vendor].findall(plan)
+
+
+def uses_index(plan: str, index: str) -> bool:
+    return bool(set(indexes_used(plan)) & ({index} | EQUIVALENT_INDEXES.get(index, set())))
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot queries (feeds, latest bid, comments, watchlist lookups) and fail if one of them "
+        "falls back to a full table scan or sorts its rows instead of reading them in index order."
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in FULL_SCAN:
+            raise CommandError(f"no plan rules for {connection.vendor}")
+        failures = []
+        for name, (queryset, index) in hot_queries().items():
+            plan = explain(queryset)
+            problems = full_scans(plan)
+            if problems:
+                failures.append(f"{name}: {'; '.join(problems)}\n{plan}")
+            used = ", ".join(indexes_used(plan)) or "no index"
+            status = self.style.ERROR(f"{'full scan':<12}") if problems else self.style.SUCCESS(f"{'ok':<12}")
+            self.stdout.write(f"{name:<24}{status}{used}" + ("" if uses_index(plan, index) else f" (meant for {index})"))
+        if failures:
+            raise CommandError("\n\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("every hot query reads through an index"))
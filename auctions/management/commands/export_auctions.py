@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from auctions.exports import EXPORTS, EXPORT_FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Write closed auctions with their winning bid and bidder (or every bid of them, --dataset bids) as CSV "
+        "or JSON Lines, streamed from the database in chunks so memory stays flat whatever the table size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", choices=EXPORTS, default="auctions")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--output", help="file to write, stdout by default")
+        parser.add_argument("--chunk-size", type=int, help="rows per query and per write (EXPORT_CHUNK_SIZE)")
+
+    def handle(self, *args, **options):
+        chunks = stream_export(options["dataset"], options["format"], options["chunk_size"])
+        if options["output"] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(options["output"], "w", newline="", encoding="utf-8") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"wrote the {options['dataset']} export to {options['output']}"))
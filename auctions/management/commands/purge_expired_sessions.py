@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from auctions.sessions import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions from the session table in batches, for cron when run_auction_scheduler "
+        "(which does it every SESSION_PURGE_INTERVAL) isn't running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="sessions deleted per query")
+
+    def handle(self, *args, **options):
+        purged = purge_expired_sessions(options["batch_size"])
+        self.stdout.write(f"purged {purged} expired sessions")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Max
+
+from auctions.category_stats import rebuild_category_stats
+from auctions.models import Category
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the listing counts and highest bid of every category from its listings. "
+        "Signals keep them up to date, this fixes them after changes made behind the ORM's back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="only report the categories whose stats are wrong")
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            wrong = [
+                category for category in Category.objects.annotate(
+                    listings_total=Count("listings"),
+                    listings_active=Count("listings", filter=Q(listings__active=True)),
+                    listings_highest=Max("listings__current_price", filter=Q(listings__active=True), default=0),
+                )
+                if (category.listing_count, category.active_count, category.highest_bid)
+                != (category.listings_total, category.listings_active, category.listings_highest)
+            ]
+            for category in wrong:
+                self.stdout.write(
+                    f"{category.name:<30} stored {category.listing_count}/{category.active_count}/{category.highest_bid}, "
+                    f"actual {category.listings_total}/{category.listings_active}/{category.listings_highest}"
+                )
+            self.stdout.write(f"{len(wrong)} categories with wrong stats")
+            return
+        updated = rebuild_category_stats()
+        self.stdout.write(f"rebuilt the stats of {updated} categories")
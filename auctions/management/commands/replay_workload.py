@@ -0,0 +1,111 @@
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from auctions.models import User, Listing, Category
+
+DEFAULT_MIX = "index=40,listing_page=25,category=10,watchlist=5,search=5,place_bid=10,comments=5"
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mixed browse/bid/comment workload against the views, in process, "
+        "and report p50/p95/p99 latency per view. Run seed_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2_000)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--mix", default=DEFAULT_MIX, help=f"view=weight pairs, default {DEFAULT_MIX}")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        mix = dict(pair.split("=") for pair in options["mix"].split(","))
+        views, weights = list(mix), [int(weight) for weight in mix.values()]
+        unknown = set(views) - set(self.requests(Client(), random.Random(), None))
+        if unknown:
+            raise CommandError(f"unknown views in --mix: {', '.join(unknown)}")
+
+        self.users = list(User.objects.order_by("id").values_list("id", flat=True)[:1_000])
+        self.listing_ids = Listing.objects.aggregate(first=Min("id"), last=Max("id"))
+        self.categories = list(Category.objects.values_list("id", flat=True))
+        if not self.users or self.listing_ids["first"] is None:
+            raise CommandError("no data to browse, run seed_data first")
+
+        timings, errors = defaultdict(list), defaultdict(int)
+        lock = threading.Lock()
+        per_thread = options["requests"] // options["threads"]
+
+        def worker(i):
+            rng = random.Random(options["seed"] + i)
+            client = Client()
+            client.force_login(User.objects.get(pk=rng.choice(self.users)))
+            requests = self.requests(client, rng, self.random_listing)
+            try:
+                for view in rng.choices(views, weights, k=per_thread):
+                    start = time.perf_counter()
+                    response = requests[view]()
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        timings[view].append(elapsed)
+                        if response.status_code >= 500 or (response.status_code >= 400 and view != "place_bid"):
+                            errors[view] += 1
+            finally:
+                connection.close()
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            start = time.perf_counter()
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(options["threads"])]
+            for thread in workers: thread.start()
+            for thread in workers: thread.join()
+            elapsed = time.perf_counter() - start
+
+        total = sum(len(values) for values in timings.values())
+        self.stdout.write(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.0f} req/s, {options['threads']} threads)")
+        self.stdout.write(f"{'view':<14}{'count':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for view in views:
+            values = sorted(timings[view])
+            if not values:
+                continue
+            p50, p95, p99 = (self.percentile(values, p) * 1000 for p in (50, 95, 99))
+            self.stdout.write(f"{view:<14}{len(values):>7}{errors[view]:>8}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}")
+
+    def random_listing(self, rng: random.Random) -> int:
+        return rng.randint(self.listing_ids["first"], self.listing_ids["last"])
+
+    def requests(self, client: Client, rng: random.Random, random_listing) -> dict:
+        def place_bid():
+            listing_id = random_listing(rng)
+            price = Listing.objects.filter(pk=listing_id).values_list("current_price", flat=True).first() or 0
+            return client.post(
+                reverse("place_bid", args=[listing_id]), {"bid": str(price + rng.randint(1, 500))}, content_type="application/json"
+            )
+
+        return {
+            "index": lambda: client.get(reverse("index")),
+            "listing_page": lambda: client.get(reverse("listing_page", args=[random_listing(rng)])),
+            "category": lambda: client.get(reverse("category", args=[rng.choice(self.categories)])),
+            "watchlist": lambda: client.get(reverse("watchlist")),
+            "search": lambda: client.get(reverse("search"), {"q": rng.choice(("dragon", "egg", "wand", "potion", "cloak"))}),
+            "place_bid": place_bid,
+            "comments": lambda: client.post(
+                reverse("comments", args=[random_listing(rng)]), json.dumps({"comment": "replayed comment"}), content_type="application/json"
+            ),
+        }
+
+    @staticmethod
+    def percentile(values: list, percent: int) -> float:
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
@@ -0,0 +1,34 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.scheduler import AuctionScheduler, process_local_backends
+
+
+class Command(BaseCommand):
+    help = "Close timed auctions as their end time passes and purge expired sessions. Run exactly one per database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="auctions closed per query")
+        parser.add_argument("--poll-interval", type=float, help="seconds between looks for new auctions")
+        parser.add_argument(
+            "--allow-local-backends", action="store_true",
+            help="start even though the cache or event broker can't reach the web workers (stale pages until the cache expires, no live closing events)",
+        )
+
+    def handle(self, *args, **options):
+        local = process_local_backends()
+        if local and not options["allow_local_backends"]:
+            raise CommandError(
+                f"{' and '.join(local)} only reach this process, the web workers would keep serving closed auctions as open: "
+                "set CACHE_BACKEND to 'file' or 'redis' and EVENT_BROKER to a shared broker, "
+                "run the scheduler in the ASGI server with AUCTION_SCHEDULER_IN_ASGI, or pass --allow-local-backends"
+            )
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        scheduler = AuctionScheduler(options["batch_size"], options["poll_interval"])
+        try:
+            scheduler.run(stop)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,138 @@
+import os
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from auctions.category_stats import rebuild_category_stats
+from auctions.models import User, Listing, Category, Watchlist, Bid, Comments
+
+WORDS = (
+    "ancient cursed dragon elder enchanted ethereal forbidden golden hidden invisible legendary lunar "
+    "mystic phoenix runic shadow silver spectral twin wandering wizard broom cauldron cloak crystal "
+    "egg feather grimoire lute orb potion ring scroll stone tome wand amulet"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset with bulk_create: users, categories, listings with pictures, "
+        "bid histories with increasing prices, comments and watchlists."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--listings", type=int, default=10_000)
+        parser.add_argument("--bids", type=int, default=5, help="max bids per listing")
+        parser.add_argument("--comments", type=int, default=3, help="max comments per listing")
+        parser.add_argument("--watchlist", type=int, default=10, help="max watched listings per user")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        prefix = f"seed{options['seed']}_"
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"a dataset with seed {options['seed']} already exists, pick another --seed")
+
+        start = time.perf_counter()
+        users = self.seed_users(prefix, options["users"])
+        categories = self.seed_categories(prefix, options["categories"])
+        listings = self.seed_listings(rng, users, categories, options)
+        self.seed_watchlists(rng, users, listings, options["watchlist"])
+        # bulk_create sends no signal, the categories' counts are computed once everything is in
+        self.stdout.write(f"{rebuild_category_stats()} category stats")
+        self.stdout.write(self.style.SUCCESS(f"done in {time.perf_counter() - start:.1f}s"))
+
+    def seed_users(self, prefix: str, count: int) -> list:
+        # hashing one password for everybody, PBKDF2 per user would take longer than the rest of the seed
+        password = make_password("wizard")
+        return self.bulk_create(User, (User(username=f"{prefix}user{i}", password=password) for i in range(count)), keep_ids=True)
+
+    def seed_categories(self, prefix: str, count: int) -> list:
+        return self.bulk_create(Category, (Category(name=f"{prefix}{i}") for i in range(count)), keep_ids=True)
+
+    def seed_listings(self, rng: random.Random, users: list, categories: list, options: dict) -> list:
+        pictures = [
+            f"auctions/ai-images/{name}" for name in sorted(os.listdir(settings.MEDIA_ROOT))
+            if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp"))
+        ] or [""]
+        listing_ids = []
+        for batch_start in range(0, options["listings"], self.batch_size):
+            batch_size = min(self.batch_size, options["listings"] - batch_start)
+            listings, histories = [], []
+            for _ in range(batch_size):
+                author_index = rng.randrange(len(users))
+                author = users[author_index]
+                prices = [rng.randint(100, 100_000)]
+                for _ in range(rng.randint(0, options["bids"] - 1)):
+                    prices.append(prices[-1] + rng.randint(1, prices[-1] // 10 + 1))
+                # the starting price is the author's, the bids after it are someone else's
+                bidders = [author] + [users[(author_index + rng.randint(1, max(len(users) - 1, 1))) % len(users)] for _ in prices[1:]]
+                histories.append(list(zip(prices, bidders)))
+                listing = Listing(
+                    title=" ".join(rng.sample(WORDS, 3)).capitalize()[:30],
+                    description=" ".join(rng.choices(WORDS, k=rng.randint(5, 30))),
+                    author_id=author,
+                    picture=rng.choice(pictures),
+                    category_id=rng.choice(categories) if categories and rng.random() < 0.9 else None,
+                    active=rng.random() < 0.8,
+                    current_price=prices[-1],
+                    current_bidder_id=bidders[-1],
+                    bid_count=len(prices),
+                )
+                # as close_auction: a closed auction is won by its last bidder, unless that's the author's starting price
+                if not listing.active and len(prices) > 1:
+                    listing.winner_id = bidders[-1]
+                listings.append(listing)
+
+            with transaction.atomic():
+                Listing.objects.bulk_create(listings)
+                Bid.objects.bulk_create(
+                    (Bid(price=price, user_id=user, listing_id=listing.pk)
+                     for listing, history in zip(listings, histories) for price, user in history),
+                    batch_size=self.batch_size,
+                )
+                Comments.objects.bulk_create(
+                    (Comments(text=" ".join(rng.choices(WORDS, k=rng.randint(3, 15))), user_id=rng.choice(users), listing_id=listing.pk)
+                     for listing in listings for _ in range(rng.randint(0, options["comments"]))),
+                    batch_size=self.batch_size,
+                )
+            listing_ids += [listing.pk for listing in listings]
+            self.stdout.write(f"{len(listing_ids)} listings")
+        return listing_ids
+
+    def seed_watchlists(self, rng: random.Random, users: list, listings: list, max_watched: int):
+        if not listings:
+            return
+        entries = (
+            Watchlist(user_id=user, listing_id=listing)
+            for user in users for listing in rng.sample(listings, min(len(listings), rng.randint(0, max_watched)))
+        )
+        self.bulk_create(Watchlist, entries)
+
+    def bulk_create(self, model, objects, keep_ids: bool = False) -> list:
+        """
+        insert objects in batches, only the primary keys are kept (when asked) so memory stays flat
+        """
+        ids, batch, count = [], [], 0
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                ids += self.flush(model, batch, keep_ids)
+                count += len(batch)
+                batch = []
+        ids += self.flush(model, batch, keep_ids)
+        count += len(batch)
+        self.stdout.write(f"{count} {model._meta.verbose_name_plural}")
+        return ids
+
+    def flush(self, model, batch: list, keep_ids: bool) -> list:
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        return [obj.pk for obj in batch] if keep_ids else []
@@ -0,0 +1,35 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into every SQLite replica (SQLITE_REPLICAS), once or every --interval "
+        "seconds, to try the read/write router locally. The interval plays the part of the replication lag."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0, help="keep copying every N seconds, 0 copies once")
+
+    def handle(self, *args, **options):
+        primary = connections["default"]
+        replicas = [settings.DATABASES[alias]["NAME"] for alias in settings.DATABASE_REPLICAS]
+        if primary.vendor != "sqlite" or not replicas:
+            raise CommandError("set SQLITE_REPLICAS to a comma separated list of replica files first")
+
+        while True:
+            primary.ensure_connection()
+            start = time.perf_counter()
+            for path in replicas:
+                # the backup API copies a consistent snapshot page by page, even while the primary is written to
+                with sqlite3.connect(path) as replica:
+                    primary.connection.backup(replica)
+                replica.close()
+            self.stdout.write(f"copied to {len(replicas)} replicas in {(time.perf_counter() - start) * 1000:.0f}ms")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
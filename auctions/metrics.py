@@ -0,0 +1,158 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger("auctions.metrics")
+
+
+class _RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+
+# a context variable rather than a thread local: asgiref copies it into the threads that run
+# sync code for async views, so queries and renders done there are still counted
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def _install_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+class TimedTemplate(Template):
+    """
+    accumulate the wall time of the outermost template render of the current request\n
+    {% extends %} and {% include %} don't go through the backend, a render_to_string() inside
+    a render does and isn't counted twice
+    """
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if metrics.template_depth == 0:
+                metrics.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    the Django template backend, with its templates timed for RequestMetricsMiddleware
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class RequestMetricsMiddleware:
+    """
+    record the number of SQL queries, the time spent in the database and the time spent
+    rendering templates for every request, sync or async. Templates are only timed with the
+    TimedDjangoTemplates backend\n
+    The numbers are logged on the `auctions.metrics` logger and, when REQUEST_METRICS_HEADERS
+    is on, sent back as X-DB-Queries/X-DB-Time/X-Template-Time and Server-Timing headers
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # connections opened before this module was imported don't have the recorder yet
+        for connection in connections.all(initialized_only=True):
+            _install_query_recorder(None, connection)
+
+        metrics = _RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = _RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - start)
+
+    def report(self, request, response, metrics: _RequestMetrics, total_time: float):
+        db_ms, template_ms, total_ms = metrics.db_time * 1000, metrics.template_time * 1000, total_time * 1000
+        logger.info(
+            "%s %s %s queries=%d db=%.1fms template=%.1fms total=%.1fms",
+            request.method, request.path, response.status_code, metrics.queries, db_ms, template_ms, total_ms
+        )
+        if getattr(settings, "REQUEST_METRICS_HEADERS", False):
+            response["X-DB-Queries"] = str(metrics.queries)
+            response["X-DB-Time"] = f"{db_ms:.1f}"
+            response["X-Template-Time"] = f"{template_ms:.1f}"
+            response["Server-Timing"] = f"db;dur={db_ms:.1f}, template;dur={template_ms:.1f}, total;dur={total_ms:.1f}"
+        return response
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries: int, using: str = "default"):
+    """
+    fail when the block runs more than `max_queries` SQL queries, the list of their SQL is yielded\n
+    Example:
+        with query_budget(4):
+            client.get(reverse('index'))
+    """
+    executed = []
+
+    def record(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    with connections[using].execute_wrapper(record):
+        yield executed
+    if len(executed) > max_queries:
+        listing = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(executed, start=1))
+        raise QueryBudgetExceeded(f"{len(executed)} queries executed, budget is {max_queries}:\n{listing}")
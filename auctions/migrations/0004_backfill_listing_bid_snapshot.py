@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def backfill_bid_snapshot(apps, schema_editor):
+    """
+    copy the newest bid of every listing into current_price/current_bidder/bid_count
+    """
+    Listing = apps.get_model('auctions', 'Listing')
+    Bid = apps.get_model('auctions', 'Bid')
+
+    stats = Bid.objects.values('listing').annotate(last_bid=Max('pk'), count=Count('pk'))
+    last_bids = Bid.objects.in_bulk([row['last_bid'] for row in stats])
+
+    listings = []
+    for row in stats:
+        last_bid = last_bids[row['last_bid']]
+        listings.append(Listing(
+            pk=row['listing'],
+            current_price=last_bid.price,
+            current_bidder_id=last_bid.user_id,
+            bid_count=row['count'],
+        ))
+    Listing.objects.bulk_update(listings, ['current_price', 'current_bidder', 'bid_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0003_listing_bid_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_bid_snapshot, migrations.RunPython.noop),
+    ]
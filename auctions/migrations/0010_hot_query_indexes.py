@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:31
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_watchlist_entries(apps, schema_editor):
+    """
+    keep the first of each (user, listing) pair so the unique constraint can be created
+    """
+    Watchlist = apps.get_model('auctions', 'Watchlist')
+    duplicates = Watchlist.objects.values('user', 'listing').annotate(first=Min('pk'), count=Count('pk')).filter(count__gt=1)
+    for row in duplicates:
+        Watchlist.objects.filter(user=row['user'], listing=row['listing']).exclude(pk=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_proxybid'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['listing', '-price'], name='bid_listing_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comments',
+            index=models.Index(fields=['listing', '-date', '-id'], name='comments_listing_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-date', '-id'], name='listing_active_date_id_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_watchlist_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='watchlist',
+            constraint=models.UniqueConstraint(fields=('user', 'listing'), name='watchlist_user_listing_unique'),
+        ),
+    ]
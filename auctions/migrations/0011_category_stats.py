@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def compute_category_stats(apps, schema_editor):
+    """
+    count the listings of every category, see auctions.category_stats.rebuild_category_stats
+    """
+    Category = apps.get_model('auctions', 'Category')
+    Listing = apps.get_model('auctions', 'Listing')
+    listings = Listing.objects.filter(category=OuterRef('pk')).order_by().values('category')
+    active = listings.filter(active=True)
+    Category.objects.update(
+        listing_count=Coalesce(Subquery(listings.annotate(count=Count('pk')).values('count')), 0),
+        active_count=Coalesce(Subquery(active.annotate(count=Count('pk')).values('count')), 0),
+        highest_bid=Coalesce(Subquery(active.annotate(highest=Max('current_price')).values('highest')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='highest_bid',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='listing_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(compute_category_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def date_existing_bids(apps, schema_editor):
+    """
+    bids weren't dated before, the closest known time is their listing's creation
+    """
+    Bid = apps.get_model('auctions', 'Bid')
+    Listing = apps.get_model('auctions', 'Listing')
+    Bid.objects.update(date=Subquery(Listing.objects.filter(pk=OuterRef('listing_id')).values('date')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0011_category_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bid',
+            name='date',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(date_existing_bids, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
-from django.db.models import Max
-from django.db import models
+from django.db.models import Max, F, Case, When, Value
+from django.db import models, transaction
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -13,16 +14,104 @@ class Listing(models.Model):
     author = models.ForeignKey('User', on_delete=models.CASCADE, related_name='author_listings') 
     description = models.TextField(blank=True)
     picture = models.ImageField(blank=True, null=True)
+    # urls of the downscaled WebP copies of picture, by label in settings.IMAGE_VARIANTS
+    image_variants = models.JSONField(default=dict, blank=True)
     category = models.ForeignKey('Category', on_delete=models.CASCADE, related_name='listings', blank=True, null=True)
     active = models.BooleanField(default=True)
+    # snapshot of the newest bid, kept in sync by record_bid() so pages don't query bids per listing
+    current_price = models.PositiveIntegerField(default=0)
+    current_bidder = models.ForeignKey('User', on_delete=models.SET_NULL, related_name='leading_listings', blank=True, null=True)
+    bid_count = models.PositiveIntegerField(default=0)
+    # open auctions with an end_time are closed by the scheduler (auctions/scheduler.py)
+    end_time = models.DateTimeField(blank=True, null=True)
+    winner = models.ForeignKey('User', on_delete=models.SET_NULL, related_name='won_listings', blank=True, null=True)
+    class Meta:
+        indexes = [
+            # keyset pagination of index and category feeds, newest first
+            models.Index(fields=['-date', '-id'], name='listing_date_id_idx'),
+            # the index feed only shows open auctions
+            models.Index(fields=['-date', '-id'], name='listing_active_date_id_idx', condition=models.Q(active=True)),
+            models.Index(fields=['category', '-date', '-id'], name='listing_category_date_id_idx'),
+            # deadlines the scheduler loads on start
+            models.Index(fields=['end_time'], name='listing_open_end_time_idx', condition=models.Q(active=True, end_time__isnull=False)),
+        ]
     def __str__(self) -> str:
         return f"{self.title}"
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        listing = super().from_db(db, field_names, values)
+        # compared with the state after a save to update the category stats, see auctions/signals.py
+        listing.counted_state = listing.category_stats_state()
+        return listing
+    def category_stats_state(self) -> tuple | None:
+        """
+        (category_id, active, current_price): what the listing counts for in its category's stats,
+        None if one of them wasn't loaded (.only(), .defer())
+        """
+        if any(field not in self.__dict__ for field in ('category_id', 'active', 'current_price')):
+            return None
+        return (self.category_id, self.active, self.current_price)
     def is_blank(self):
         return not self.title or self.title.isspace()
+    def is_expired(self):
+        return self.end_time is not None and self.end_time <= timezone.now()
+    def close_auction(self) -> bool:
+        """
+        stop the auction, the current bidder wins unless the only bid is the author's starting price\n
+        One conditional UPDATE that picks the winner in SQL, so a bid committed since this instance
+        was loaded is neither overwritten nor passed over. returns False if it was already closed
+        """
+        with transaction.atomic():
+            closed = Listing.objects.filter(pk=self.pk, active=True).update(
+                active = False,
+                winner = Case(When(current_bidder=F('author'), then=Value(None)), default=F('current_bidder'))
+            )
+            self._state_changed()
+        return bool(closed)
+    def open_auction(self) -> bool:
+        """
+        resume the auction, an end time that already passed is dropped so it doesn't close right away\n
+        returns False if it was already open
+        """
+        with transaction.atomic():
+            opened = Listing.objects.filter(pk=self.pk, active=False).update(
+                active = True,
+                winner = None,
+                end_time = Case(When(end_time__lte=timezone.now(), then=Value(None)), default=F('end_time'))
+            )
+            self._state_changed()
+        return bool(opened)
+    def _state_changed(self):
+        # update() sends no signal: refresh the instance, then do what listing_changed and
+        # listing_saved_stats would have done (imported here, auctions.signals imports the models)
+        from .category_stats import rebuild_category_stats
+        from .signals import invalidate_listing_fragments
+        self.refresh_from_db(fields=['active', 'winner', 'end_time', 'current_price', 'current_bidder', 'bid_count'])
+        self.counted_state = self.category_stats_state()
+        invalidate_listing_fragments(self.pk)
+        rebuild_category_stats([self.pk])
+    def record_bid(self, bid):
+        """
+        update the current price/bidder snapshot with a newly inserted bid\n
+        must run inside the same transaction as the Bid insert
+        """
+        Listing.objects.filter(pk=self.pk).update(
+            current_price = bid.price,
+            current_bidder = bid.user,
+            bid_count = F('bid_count') + 1
+        )
+        self.current_price = bid.price
+        self.current_bidder = bid.user
+        self.bid_count += 1
 
 
 class Category(models.Model):
     name = models.CharField(max_length=30, unique=True)
+    # stats of the category's listings, kept up to date by auctions/category_stats.py so pages don't aggregate them
+    listing_count = models.PositiveIntegerField(default=0)
+    active_count = models.PositiveIntegerField(default=0)
+    # highest current price among its open auctions
+    highest_bid = models.PositiveIntegerField(default=0)
     def __str__(self) -> str:
         return f"{self.name}"
 
@@ -30,6 +119,14 @@ class Category(models.Model):
 class Watchlist(models.Model):
     user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='watchlist')
     listing = models.ForeignKey('Listing', on_delete=models.CASCADE, related_name='watchlist_items')
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='watchlist_user_id_idx'),
+        ]
+        constraints = [
+            # also the index behind "is this listing in the user's watchlist"
+            models.UniqueConstraint(fields=['user', 'listing'], name='watchlist_user_listing_unique'),
+        ]
     def __str__(self) -> str:
         return f"{self.listing} is in {self.user} watchlist"
 
@@ -38,11 +135,34 @@ class Bid(models.Model):
     price = models.PositiveIntegerField()
     user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='bids')
     listing = models.ForeignKey('Listing', on_delete=models.CASCADE, related_name='bids')
+    # bids from before it was added carry their listing's date
+    date = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [
+            # highest (so latest) bid of a listing
+            models.Index(fields=['listing', '-price'], name='bid_listing_price_idx'),
+        ]
     def __str__(self) -> str:
         return f"{self.price}"  
     def is_valid_bid(self):
         max_bid = Bid.objects.filter(listing=self.listing).exclude(pk=self.pk).aggregate(max_bid=Max('price'))['max_bid']
         return self.price > max_bid
+
+
+class ProxyBid(models.Model):
+    """
+    the hidden maximum a user is willing to pay for a listing\n
+    accept_bid (auctions/bidding.py) bids on the user's behalf, one increment at a time, up to max_price
+    """
+    max_price = models.PositiveIntegerField()
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='proxy_bids')
+    listing = models.ForeignKey('Listing', on_delete=models.CASCADE, related_name='proxy_bids')
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'user'], name='proxybid_listing_user_unique'),
+        ]
+    def __str__(self) -> str:
+        return f"{self.user} up to {self.max_price} on {self.listing}"
     
 
 class Comments(models.Model):
@@ -50,7 +170,28 @@ class Comments(models.Model):
     user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='comments')
     listing = models.ForeignKey('Listing', on_delete=models.CASCADE, related_name='comments')
     date = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [
+            # a listing's comments, newest first
+            models.Index(fields=['listing', '-date', '-id'], name='comments_listing_date_id_idx'),
+        ]
     def __str__(self) -> str:
         return f"{self.text}"
     def is_blank(self):
-        return not self.text or self.text.isspace()
\ No newline at end of file
+        return not self.text or self.text.isspace()
+
+class TrendingScore(models.Model):
+    """
+    how hot a listing is: its bids and comments, each worth less as time goes by\n
+    Stored as a log so it never has to be decayed in place, see auctions/trending.py.
+    Persisted from the in-memory leaderboards every TRENDING_FLUSH_INTERVAL
+    """
+    listing = models.OneToOneField('Listing', on_delete=models.CASCADE, primary_key=True, related_name='trending_score')
+    score = models.FloatField()
+    class Meta:
+        indexes = [
+            # the leaderboard a process starts with
+            models.Index(fields=['-score'], name='trendingscore_score_idx'),
+        ]
+    def __str__(self) -> str:
+        return f"{self.listing_id}: {self.score:.2f}"
@@ -0,0 +1,89 @@
+import base64
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+@dataclass
+class CursorPage:
+    items: list
+    next_cursor: str | None
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list | None:
+    """
+    turn a cursor back into the key values it was made of\n
+    None is returned for a missing or tampered cursor, which means "first page"
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def paginate_by_cursor(queryset, cursor: str | None, fields=('date', 'id'), page_size: int | None = None) -> CursorPage:
+    """
+    keyset pagination, newest first\n
+    Rows are ordered by `fields` descending and a page starts right after the key of the
+    last row of the previous page, so the database seeks through an index instead of
+    counting an OFFSET: the 1000th page costs the same as the first one.\n
+    The last field must be unique (usually the primary key) to break ties
+    """
+    page_size = page_size or settings.LISTINGS_PAGE_SIZE
+    queryset = queryset.order_by(*(f'-{field}' for field in fields))
+
+    values = _cursor_values(queryset.model, fields, decode_cursor(cursor)) if cursor else None
+    if values:
+        # (a, b) < (va, vb)  ->  a < va OR (a = va AND b < vb)
+        after = Q()
+        for i, field in enumerate(fields):
+            equal_prefix = {fields[j]: values[j] for j in range(i)}
+            after |= Q(**equal_prefix, **{f'{field}__lt': values[i]})
+        queryset = queryset.filter(after)
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([str(_resolve(last, field)) for field in fields])
+    return CursorPage(items, next_cursor)
+
+
+def _cursor_values(model, fields, values: list | None) -> list | None:
+    """
+    a decoded cursor's values converted to the types of their fields, None (first page) when
+    one of them doesn't fit, so a tampered cursor can't reach the database as a bad filter
+    """
+    if not values or len(values) != len(fields):
+        return None
+    converted = []
+    try:
+        for field_path, value in zip(fields, values):
+            if value is None:
+                return None
+            opts = model._meta
+            for name in field_path.split('__'):
+                field = opts.get_field(name)
+                if field.related_model is not None:
+                    opts = field.related_model._meta
+            value = field.to_python(value)
+            field.run_validators(value)
+            converted.append(value)
+    except (ValidationError, ValueError, TypeError):
+        return None
+    return converted
+
+
+def _resolve(obj, field: str):
+    for attribute in field.split('__'):
+        obj = getattr(obj, attribute)
+    return obj.isoformat() if hasattr(obj, 'isoformat') else obj
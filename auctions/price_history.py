@@ -0,0 +1,97 @@
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FloatField, Func
+
+from .models import Bid, Listing
+
+try:
+    import numpy
+except ImportError:
+    # optional, the buckets are computed in pure Python without it
+    numpy = None
+
+
+class Epoch(Func):
+    """
+    seconds since 1970 of a datetime column, computed by the database so 100k rows don't go
+    through Python's datetime parsing
+    """
+    output_field = FloatField()
+    template = "EXTRACT(EPOCH FROM %(expressions)s)"
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # datetimes are stored as UTC text, julianday() reads them
+        return self.as_sql(compiler, connection, template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # EXTRACT gives a numeric, which would come back as Decimal
+        return self.as_sql(compiler, connection, template="EXTRACT(EPOCH FROM %(expressions)s)::double precision", **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="UNIX_TIMESTAMP(%(expressions)s)", **extra_context)
+
+
+def price_history(listing_id: int, points: int) -> dict:
+    """
+    a listing's price over time, at most `points` points, cached per (listing, points)\n
+    The cache key carries the listing's bid_count, so a new bid makes a new series instead of
+    waiting for PRICE_HISTORY_CACHE_TIMEOUT. Raises Listing.DoesNotExist\n
+    Example:
+        {'listing': 3, 'bids': 100000, 'points': [[1791334800000, 100, 5400, 5400], ...]}
+        each point is [time of its last bid (ms), min, max, last price of its bucket]
+    """
+    bid_count = Listing.objects.values_list('bid_count', flat=True).get(pk=listing_id)
+    key = f"price_history:{listing_id}:{points}:{bid_count}"
+    series = cache.get(key)
+    if series is None:
+        # a listing's bids only go up, so by price is by time, and bid_listing_price_idx reads them sorted
+        rows = Bid.objects.filter(listing_id=listing_id).order_by('price').values_list(Epoch('date'), 'price')
+        times, prices = zip(*rows) if bid_count else ((), ())
+        series = {'listing': listing_id, 'bids': len(prices), 'points': downsample(times, prices, points)}
+        cache.set(key, series, settings.PRICE_HISTORY_CACHE_TIMEOUT)
+    return series
+
+
+def downsample(times, prices, buckets: int) -> list:
+    """
+    cut the time span into `buckets` equal buckets and keep [last time (ms), min, max, last price]
+    of every bucket that has bids, every bid as is when there are no more than buckets\n
+    times must be sorted, in seconds. Vectorized with NumPy when it's installed\n
+    Examples:
+        ([0, 1, 2, 3], [10, 30, 20, 40], 2) -> [[1000, 10, 30, 30], [3000, 20, 40, 40]]\n
+        ([0, 5], [10, 20], 500) -> [[0, 10, 10, 10], [5000, 20, 20, 20]]
+    """
+    if len(prices) <= buckets:
+        return [[round(time * 1000), price, price, price] for time, price in zip(times, prices)]
+    start, span = times[0], times[-1] - times[0]
+    width = span / buckets if span else 1.0
+    if numpy is not None:
+        return _downsample_numpy(times, prices, buckets, start, width)
+
+    # times are sorted: a bucket is the run of rows between two bisections, min() and max() go through it in C
+    series = []
+    first = 0
+    for bucket in range(1, buckets + 1):
+        last = bisect_left(times, start + bucket * width, first) if bucket < buckets else len(prices)
+        if last > first:
+            run = prices[first:last]
+            series.append([round(times[last - 1] * 1000), min(run), max(run), run[-1]])
+        first = last
+    return series
+
+
+def _downsample_numpy(times, prices, buckets: int, start: float, width: float) -> list:
+    times = numpy.asarray(times, dtype=numpy.float64)
+    prices = numpy.asarray(prices, dtype=numpy.int64)
+    edges = numpy.searchsorted(times, start + width * numpy.arange(1, buckets), side='left')
+    # where each bucket starts, the empty ones (starting where the next does) dropped
+    bounds = numpy.unique(numpy.concatenate(([0], edges, [len(prices)])))
+    firsts, lasts = bounds[:-1], bounds[1:] - 1
+    return numpy.column_stack((
+        numpy.rint(times[lasts] * 1000).astype(numpy.int64),
+        numpy.minimum.reduceat(prices, firsts),
+        numpy.maximum.reduceat(prices, firsts),
+        prices[lasts],
+    )).tolist()
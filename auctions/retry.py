@@ -0,0 +1,43 @@
+import logging
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+logger = logging.getLogger(__name__)
+
+# what SQLite raises once busy_timeout ran out waiting for another connection's write lock
+LOCK_ERRORS = ("database is locked", "database table is locked")
+
+
+def is_lock_error(error: Exception) -> bool:
+    return isinstance(error, OperationalError) and any(message in str(error) for message in LOCK_ERRORS)
+
+
+def retry_on_lock(func):
+    """
+    run func again when the database is locked, up to DATABASE_LOCK_RETRIES times\n
+    func must be a whole transaction (or a single statement): a lock error rolls it back, so
+    running it again from the start is safe. Inside an outer atomic block the error is raised
+    as is, the outer transaction is broken and only its owner can start it over.\n
+    Waits grow exponentially from DATABASE_LOCK_RETRY_DELAY, with full jitter so the writers
+    that collided don't all come back at the same moment\n
+    Examples:
+        @retry_on_lock
+        def accept_bid(...): ...\n
+        retry_on_lock(Comments.objects.create)(text=text, user=user, listing=listing)
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(settings.DATABASE_LOCK_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if not is_lock_error(error) or connection.in_atomic_block or attempt == settings.DATABASE_LOCK_RETRIES:
+                    raise
+                delay = random.uniform(0, settings.DATABASE_LOCK_RETRY_DELAY * 2 ** attempt)
+                logger.info("%s: database locked, retry %d in %.3fs", func.__qualname__, attempt + 1, delay)
+                time.sleep(delay)
+    return wrapper
@@ -0,0 +1,125 @@
+import contextvars
+import random
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+class _Routing:
+    def __init__(self, pinned: bool):
+        # the user wrote less than REPLICA_PIN_SECONDS ago, a replica may not have their changes yet
+        self.pinned = pinned
+        # inside a view decorated with read_from_replica
+        self.read_only = False
+        self.wrote = False
+
+
+# a context variable, like auctions.metrics, so the state follows sync views run in asgiref threads
+_current = contextvars.ContextVar("db_routing", default=None)
+
+
+class PrimaryReplicaRouter:
+    """
+    send the reads of read_from_replica views to a random DATABASE_REPLICAS alias, everything else to 'default'\n
+    Replicas are copies of the primary, so objects from both can be related and only the
+    primary is ever migrated
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _current.get()
+        # a session missing from a lagging replica would log the user out: Django drops its cookie.
+        # the same goes for request.user, first loaded inside whatever view touches it
+        if model._meta.app_label == 'sessions' or model._meta.label == settings.AUTH_USER_MODEL:
+            return 'default'
+        if routing and routing.read_only and not routing.pinned and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        routing = _current.get()
+        if routing:
+            routing.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    read-your-writes: a request that wrote to the primary pins its user to the primary for
+    REPLICA_PIN_SECONDS, with a cookie, so the pages that follow don't come from a lagging replica\n
+    Must come before SessionMiddleware so session saves count as writes
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = _Routing(pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        token = _current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.pin(response, routing)
+
+    async def __acall__(self, request):
+        routing = _Routing(pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        token = _current.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.pin(response, routing)
+
+    def pin(self, response, routing: _Routing):
+        if routing.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+def read_from_replica(view):
+    """
+    view decorator: the queries of the view may read from a replica, unless the user is pinned to the primary\n
+    Sessions and the logged in user are always read from the primary, by the router, so it
+    works with or without @login_required
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with _read_only():
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with _read_only():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def _read_only():
+    routing = _current.get()
+    if routing is None:
+        yield
+        return
+    previous, routing.read_only = routing.read_only, True
+    try:
+        yield
+    finally:
+        routing.read_only = previous
@@ -0,0 +1,161 @@
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.db.models import Case, When, F, Value
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .events import InProcessBroker, publish_listing_event
+from .models import Listing
+from .sessions import purge_expired_sessions
+from .category_stats import rebuild_category_stats
+from .signals import invalidate_listing_fragments
+
+logger = logging.getLogger(__name__)
+
+
+def process_local_backends() -> list:
+    """
+    the settings whose backend only reaches this process, so a scheduler running in a process of
+    its own would evict cached fragments and publish closing events nobody else sees\n
+    Examples:
+        process_local_backends() -> ['CACHES', 'EVENT_BROKER'] with the defaults\n
+        process_local_backends() -> [] with CACHE_BACKEND=redis and a Redis broker
+    """
+    local = []
+    if isinstance(caches['default'], LocMemCache):
+        local.append('CACHES')
+    if issubclass(import_string(settings.EVENT_BROKER), InProcessBroker):
+        local.append('EVENT_BROKER')
+    return local
+
+
+class AuctionScheduler:
+    """
+    close timed auctions when their end_time passes, and purge expired sessions every SESSION_PURGE_INTERVAL\n
+    Deadlines live in a min-heap, so the next one is always on top: scheduling and closing cost
+    O(log n) each instead of a scan over every open listing. Only one scheduler should run for
+    a database (run_auction_scheduler, or the ASGI lifespan with AUCTION_SCHEDULER_IN_ASGI).\n
+    Web workers never talk to the scheduler directly:
+        - new listings are picked up by polling ids greater than the last one seen
+        - soft-close extensions only ever push a deadline later, so an entry popped from the
+          heap is checked against the database and pushed back if the auction was extended
+    """
+
+    def __init__(self, batch_size: int | None = None, poll_interval: float | None = None):
+        self.batch_size = batch_size or settings.AUCTION_SCHEDULER_BATCH_SIZE
+        self.poll_interval = poll_interval or settings.AUCTION_SCHEDULER_POLL_INTERVAL
+        self.deadlines = []
+        self.last_seen_id = 0
+        self.next_session_purge = 0.0
+
+    def load(self):
+        """
+        put every open timed auction on the heap, once, when the scheduler starts
+        """
+        open_auctions = Listing.objects.filter(active=True, end_time__isnull=False)
+        self.deadlines = [(end_time, pk) for end_time, pk in open_auctions.values_list('end_time', 'id').iterator(chunk_size=10_000)]
+        heapq.heapify(self.deadlines)
+        self.last_seen_id = Listing.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def discover(self):
+        """
+        schedule the timed auctions created since the last poll
+        """
+        new_auctions = Listing.objects.filter(pk__gt=self.last_seen_id).order_by('id').values_list('id', 'end_time', 'active')
+        for pk, end_time, active in new_auctions.iterator(chunk_size=10_000):
+            self.last_seen_id = pk
+            if active and end_time is not None:
+                heapq.heappush(self.deadlines, (end_time, pk))
+
+    def close_due(self, now=None) -> list:
+        """
+        close every auction whose deadline passed, in batches of batch_size\n
+        returns the ids of the listings that were closed
+        """
+        now = now or timezone.now()
+        closed = []
+        while self.deadlines and self.deadlines[0][0] <= now:
+            due = []
+            while self.deadlines and self.deadlines[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self.deadlines)[1])
+
+            expired = Listing.objects.filter(pk__in=due, active=True, end_time__lte=now)
+            expired_ids = list(expired.values_list('id', flat=True))
+            # the author's starting price isn't a winning bid
+            Listing.objects.filter(pk__in=expired_ids, active=True).update(
+                active = False,
+                winner = Case(When(current_bidder=F('author'), then=Value(None)), default=F('current_bidder'))
+            )
+            closed += expired_ids
+
+            # the rest were extended by a late bid, closed by hand or deleted: follow the new deadline if any
+            extended = Listing.objects.filter(pk__in=set(due) - set(expired_ids), active=True, end_time__isnull=False)
+            for pk, end_time in extended.values_list('id', 'end_time'):
+                heapq.heappush(self.deadlines, (end_time, pk))
+
+        invalidate_listing_fragments(*closed)
+        if closed:
+            # closed with update(), which sends no signal
+            rebuild_category_stats(closed)
+        for pk in closed:
+            publish_listing_event(pk, 'state', {'active': False})
+        if closed:
+            logger.info("closed %d auctions", len(closed))
+        return closed
+
+    def purge_sessions(self):
+        if time.monotonic() < self.next_session_purge:
+            return
+        self.next_session_purge = time.monotonic() + settings.SESSION_PURGE_INTERVAL
+        purge_expired_sessions()
+
+    def seconds_to_next_deadline(self) -> float:
+        if not self.deadlines:
+            return self.poll_interval
+        wait = (self.deadlines[0][0] - timezone.now()).total_seconds()
+        return max(0.0, min(wait, self.poll_interval))
+
+    def run(self, stop: threading.Event):
+        """
+        close auctions until stop is set: sleep until the next deadline, or the next poll for new auctions
+        """
+        self.load()
+        logger.info("scheduler started with %d open timed auctions", len(self.deadlines))
+        try:
+            while not stop.is_set():
+                self.discover()
+                self.close_due()
+                self.purge_sessions()
+                stop.wait(self.seconds_to_next_deadline())
+        finally:
+            connection.close()
+
+
+def with_scheduler_lifespan(application):
+    """
+    wrap an ASGI application so the auction scheduler runs in a thread for the lifetime of the server\n
+    Django's ASGI handler doesn't speak the lifespan protocol, this answers it before delegating
+    """
+    async def app(scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await application(scope, receive, send)
+
+        stop = threading.Event()
+        thread = threading.Thread(target=AuctionScheduler().run, args=(stop,), name='auction-scheduler', daemon=True)
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                thread.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                stop.set()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    return app
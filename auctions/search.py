@@ -0,0 +1,195 @@
+import re
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import Listing
+
+# SQLite: FTS5 tables over the listing and comment columns, kept in sync by triggers.
+# Everything is IF NOT EXISTS so install_search_index() can run again after a migration
+# remakes auctions_listing or auctions_comments, which drops their triggers.
+SQLITE_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS auctions_listing_fts USING fts5(
+        title, description, content='auctions_listing', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    # rank = bm25 with titles weighing 10x descriptions, the score of a listing's own hits in _sqlite_search
+    "INSERT INTO auctions_listing_fts(auctions_listing_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    """CREATE TRIGGER IF NOT EXISTS auctions_listing_fts_insert AFTER INSERT ON auctions_listing BEGIN
+        INSERT INTO auctions_listing_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS auctions_listing_fts_delete AFTER DELETE ON auctions_listing BEGIN
+        INSERT INTO auctions_listing_fts(auctions_listing_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS auctions_listing_fts_update AFTER UPDATE OF title, description ON auctions_listing BEGIN
+        INSERT INTO auctions_listing_fts(auctions_listing_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO auctions_listing_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS auctions_comments_fts USING fts5(
+        text, listing_id UNINDEXED, content='auctions_comments', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS auctions_comments_fts_insert AFTER INSERT ON auctions_comments BEGIN
+        INSERT INTO auctions_comments_fts(rowid, text, listing_id) VALUES (new.id, new.text, new.listing_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS auctions_comments_fts_delete AFTER DELETE ON auctions_comments BEGIN
+        INSERT INTO auctions_comments_fts(auctions_comments_fts, rowid, text, listing_id) VALUES ('delete', old.id, old.text, old.listing_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS auctions_comments_fts_update AFTER UPDATE OF text, listing_id ON auctions_comments BEGIN
+        INSERT INTO auctions_comments_fts(auctions_comments_fts, rowid, text, listing_id) VALUES ('delete', old.id, old.text, old.listing_id);
+        INSERT INTO auctions_comments_fts(rowid, text, listing_id) VALUES (new.id, new.text, new.listing_id);
+    END""",
+]
+
+# PostgreSQL: stored generated tsvector columns, the database keeps them in sync by itself
+POSTGRESQL_SCHEMA = [
+    """ALTER TABLE auctions_listing ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS auctions_listing_search_idx ON auctions_listing USING GIN (search_vector)",
+    """ALTER TABLE auctions_comments ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(text, ''))
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS auctions_comments_search_idx ON auctions_comments USING GIN (search_vector)",
+]
+
+# a comment mentioning the words counts less than the listing's own title or description
+COMMENT_WEIGHT = 0.5
+
+
+@dataclass
+class SearchPage:
+    items: list
+    next_page: int | None
+
+
+def install_search_index(db_connection, rebuild: bool = False):
+    """
+    create the full-text index of the connection's database if it's missing\n
+    rebuild=True re-reads every listing and comment into the SQLite index
+    """
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'sqlite':
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+            if rebuild:
+                cursor.execute("INSERT INTO auctions_listing_fts(auctions_listing_fts) VALUES ('rebuild')")
+                cursor.execute("INSERT INTO auctions_comments_fts(auctions_comments_fts) VALUES ('rebuild')")
+        elif db_connection.vendor == 'postgresql':
+            for statement in POSTGRESQL_SCHEMA:
+                cursor.execute(statement)
+
+
+def reinstall_after_migrate(sender, using, **kwargs):
+    """
+    post_migrate hook: put back the SQLite triggers a table remake may have dropped\n
+    the FTS content itself survives a remake, rows keep their ids
+    """
+    db_connection = connections[using]
+    if db_connection.vendor == 'sqlite' and 'auctions_listing_fts' in db_connection.introspection.table_names():
+        install_search_index(db_connection)
+
+
+def uninstall_search_index(db_connection):
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'sqlite':
+            cursor.execute("DROP TABLE IF EXISTS auctions_listing_fts")
+            cursor.execute("DROP TABLE IF EXISTS auctions_comments_fts")
+            for table in ('listing', 'comments'):
+                for action in ('insert', 'delete', 'update'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS auctions_{table}_fts_{action}")
+        elif db_connection.vendor == 'postgresql':
+            cursor.execute("ALTER TABLE auctions_listing DROP COLUMN IF EXISTS search_vector")
+            cursor.execute("ALTER TABLE auctions_comments DROP COLUMN IF EXISTS search_vector")
+
+
+def fts5_query(query: str) -> str:
+    """
+    turn user input into a safe FTS5 query: every word must match, the last one as a prefix\n
+    Examples:
+        'dragon egg' -> "dragon" "egg"*\n
+        'ice-cream "cone' -> "ice" "cream" "cone"*
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def search_listings(query: str, page: int = 1, include_comments: bool = True, page_size: int | None = None) -> SearchPage:
+    """
+    listings matching every word of query, best match first\n
+    Titles weigh more than descriptions, which weigh more than comments
+    """
+    page_size = page_size or settings.LISTINGS_PAGE_SIZE
+    page = max(1, min(page, settings.SEARCH_MAX_PAGE))
+    offset = (page - 1) * page_size
+
+    if connection.vendor == 'sqlite':
+        ids = _sqlite_search(query, include_comments, offset, page_size + 1)
+    elif connection.vendor == 'postgresql':
+        ids = _postgresql_search(query, include_comments, offset, page_size + 1)
+    else:
+        ids = _fallback_search(query, include_comments, offset, page_size + 1)
+
+    has_next = len(ids) > page_size and page < settings.SEARCH_MAX_PAGE
+    ids = ids[:page_size]
+    listings = Listing.objects.in_bulk(ids)
+    return SearchPage([listings[pk] for pk in ids if pk in listings], page + 1 if has_next else None)
+
+
+def _sqlite_search(query: str, include_comments: bool, offset: int, limit: int) -> list:
+    match = fts5_query(query)
+    if not match:
+        return []
+    # a listing's comments count once, with their best rank, before the page is cut: otherwise a
+    # listing with many matching comments fills the LIMIT and pushes the other listings off every
+    # page. ranks are negative bm25 scores and lower is better
+    comments = (
+        " UNION ALL SELECT listing_id, MIN(rank) * %s FROM auctions_comments_fts "
+        "WHERE auctions_comments_fts MATCH %s GROUP BY listing_id"
+    ) if include_comments else ""
+    params = [match] + ([COMMENT_WEIGHT, match] if include_comments else []) + [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT listing_id FROM ("
+            "SELECT rowid AS listing_id, rank AS score FROM auctions_listing_fts WHERE auctions_listing_fts MATCH %s"
+            f"{comments}"
+            ") hits GROUP BY listing_id ORDER BY MIN(score), listing_id LIMIT %s OFFSET %s",
+            params
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _postgresql_search(query: str, include_comments: bool, offset: int, limit: int) -> list:
+    comments = (
+        " UNION ALL SELECT listing_id, ts_rank(search_vector, q) * %s FROM auctions_comments, websearch_to_tsquery('english', %s) q "
+        "WHERE search_vector @@ q"
+    ) if include_comments else ""
+    params = [query] + ([COMMENT_WEIGHT, query] if include_comments else []) + [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT id FROM ("
+            "SELECT id, ts_rank(search_vector, q) AS score FROM auctions_listing, websearch_to_tsquery('english', %s) q "
+            f"WHERE search_vector @@ q{comments}"
+            ") hits GROUP BY id ORDER BY max(score) DESC, id LIMIT %s OFFSET %s",
+            params
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(query: str, include_comments: bool, offset: int, limit: int) -> list:
+    """
+    unindexed LIKE scan for databases without a full-text index
+    """
+    condition = Q()
+    for word in re.findall(r'\w+', query):
+        word_condition = Q(title__icontains=word) | Q(description__icontains=word)
+        if include_comments:
+            word_condition |= Q(comments__text__icontains=word)
+        condition &= word_condition
+    if not condition:
+        return []
+    ids = Listing.objects.filter(condition).order_by('-date', '-id').values_list('id', flat=True).distinct()
+    return list(ids[offset:offset + limit])
+
@@ -0,0 +1,41 @@
+import logging
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+from .retry import retry_on_lock
+
+logger = logging.getLogger(__name__)
+
+
+@retry_on_lock
+def _delete_expired(keys: list, now) -> int:
+    # checked again, a session used since it was picked has a new expire_date
+    deleted, _ = Session.objects.filter(pk__in=keys, expire_date__lt=now).delete()
+    return deleted
+
+
+def purge_expired_sessions(batch_size: int | None = None, now=None) -> int:
+    """
+    delete the expired rows of the session table, batch_size (SESSION_PURGE_BATCH_SIZE) per query\n
+    Unlike `manage.py clearsessions`, which deletes them all in one statement, the write lock is
+    only held for a batch at a time, so logins and bids aren't stuck behind a purge of a table
+    that grew for months. The rows are found through the expire_date index.\n
+    Works whatever SESSION_ENGINE is: the cache and cookie engines don't write the table, but it
+    still holds the sessions from before they were switched on.\n
+    returns the number of sessions deleted
+    """
+    batch_size = batch_size or settings.SESSION_PURGE_BATCH_SIZE
+    now = now or timezone.now()
+    purged = 0
+    while True:
+        keys = list(Session.objects.filter(expire_date__lt=now).values_list('pk', flat=True)[:batch_size])
+        if not keys:
+            break
+        purged += _delete_expired(keys, now)
+        if len(keys) < batch_size:
+            break
+    if purged:
+        logger.info("purged %d expired sessions", purged)
+    return purged
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .category_stats import count_listing_change, count_bid, invalidate_category_list, rebuild_category_stats
+from .models import Listing, Category, Bid, Comments
+from .trending import record_event
+
+# {% cache %} fragments of a single listing, keyed by listing id
+LISTING_FRAGMENTS = ("listing_card", "watchlist_card")
+
+
+def invalidate_listing_fragments(*listing_ids: int):
+    """
+    drop the cached cards of listings once the current transaction commits\n
+    evicting before the commit would let a concurrent request cache the old price again
+    """
+    keys = [make_template_fragment_key(fragment, [pk]) for pk in listing_ids for fragment in LISTING_FRAGMENTS]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver([post_save, post_delete], sender=Listing)
+def listing_changed(sender, instance, **kwargs):
+    invalidate_listing_fragments(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Bid)
+def bid_changed(sender, instance, **kwargs):
+    invalidate_listing_fragments(instance.listing_id)
+
+
+@receiver(post_save, sender=Listing)
+def listing_saved_stats(sender, instance, created, **kwargs):
+    old, new = None if created else getattr(instance, 'counted_state', None), instance.category_stats_state()
+    if (old is None and not created) or new is None:
+        # saved with fields that weren't loaded, what it counted for before is unknown
+        rebuild_category_stats([instance.pk])
+    else:
+        count_listing_change(old, new)
+    instance.counted_state = new
+
+
+@receiver(post_delete, sender=Listing)
+def listing_deleted_stats(sender, instance, **kwargs):
+    old = getattr(instance, 'counted_state', None) or instance.category_stats_state()
+    if old is not None:
+        count_listing_change(old, None)
+
+
+@receiver(post_save, sender=Bid)
+def bid_saved_stats(sender, instance, created, **kwargs):
+    if created:
+        count_bid(instance.listing_id, instance.price)
+        record_event(instance.listing_id, 'bid')
+
+
+@receiver(post_save, sender=Comments)
+def comment_saved_trending(sender, instance, created, **kwargs):
+    if created:
+        record_event(instance.listing_id, 'comment')
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    invalidate_category_list()
@@ -37,7 +37,7 @@ function changeBidState(url){
         method: 'POST',
         headers: {'X-CSRFToken': csrftoken},
         mode: 'same-origin', // Do not send CSRF token to another domain.  
-        body: JSON.stringify({ bid: bid.value }),
+        body: JSON.stringify({ bid: bid.value, max_bid: maxBid.value }),
     })
     .then(async response => {
         if (response.ok){
@@ -47,6 +47,7 @@ function changeBidState(url){
             const flash = addFlashMessage('alert-danger', error);
             removeFlashMessage(flash);
             bid.value = '';
+            maxBid.value = '';
             throw new Error(`Error: ${error}, status: ${response.status}`);
         }
     })
@@ -54,6 +55,7 @@ function changeBidState(url){
         const flash = addFlashMessage('alert-success', data['message']);
         removeFlashMessage(flash);
         bid.value = '';
+        maxBid.value = '';
         bidPrice.innerText = `$ ${data['bid']}`;
     })
     .catch(error =>{
@@ -83,16 +85,7 @@ function addComment(url){
         }
     })
     .then(data => {
-        const newComment = htmlToElement(
-            `<li class="list-group-item">
-                <div class="comment-header">
-                    <strong>${data['user']}</strong>
-                    <span>${data['date']}</span>
-                </div>
-                <p>${data['text']}</p>
-            </li>`
-        );
-        commentSection.prepend(newComment);
+        commentSection.prepend(commentElement(data));
         comment.value = '';
     })
     .catch(error => {
@@ -100,6 +93,39 @@ function addComment(url){
     });
 }
 
+function commentElement(data){
+    const element = htmlToElement(
+        `<li class="list-group-item">
+            <div class="comment-header">
+                <strong></strong>
+                <span></span>
+            </div>
+            <p></p>
+        </li>`
+    );
+    // set as text, comments are user input
+    element.querySelector('strong').textContent = data['user'];
+    element.querySelector('span').textContent = data['date'];
+    element.querySelector('p').textContent = data['text'];
+    return element;
+}
+
+function loadMoreComments(button){
+    fetch(`${button.dataset.action}?cursor=${encodeURIComponent(button.dataset.cursor)}`)
+    .then(response => {
+        if (!response.ok) throw new Error(`Error: status ${response.status}`);
+        return response.json();
+    })
+    .then(data => {
+        data['comments'].forEach(item => commentSection.append(commentElement(item)));
+        if (data['next_cursor']) button.dataset.cursor = data['next_cursor'];
+        else button.remove();
+    })
+    .catch(error => {
+        console.log(error.message)
+    });
+}
+
 // function changeAuctionState(url){
 //     fetch(url, {
 //         method: 'POST',
@@ -159,6 +185,52 @@ function addComment(url){
 //     });
 // }
 
+function drawPriceHistory(canvas){
+    // one point per pixel column at most, the server downsamples to it
+    fetch(`${canvas.dataset.action}?points=${canvas.width}`)
+    .then(response => response.json())
+    .then(data => {
+        const points = data['points'];
+        if (points.length < 2) return;
+        const context = canvas.getContext('2d');
+        const [firstTime, lastTime] = [points[0][0], points[points.length - 1][0]];
+        const low = Math.min(...points.map(point => point[1]));
+        const high = Math.max(...points.map(point => point[2]));
+        const x = time => (time - firstTime) / ((lastTime - firstTime) || 1) * (canvas.width - 1);
+        const y = price => canvas.height - 1 - (price - low) / ((high - low) || 1) * (canvas.height - 1);
+
+        // min to max of every bucket, then the last price of each
+        context.strokeStyle = 'hsla(145, 93%, 29%, 0.3)';
+        points.forEach(([time, min, max]) => {
+            context.beginPath();
+            context.moveTo(x(time), y(min));
+            context.lineTo(x(time), y(max));
+            context.stroke();
+        });
+        context.strokeStyle = 'hsl(145, 93%, 29%)';
+        context.beginPath();
+        points.forEach(([time, , , last], i) => i ? context.lineTo(x(time), y(last)) : context.moveTo(x(time), y(last)));
+        context.stroke();
+    })
+    .catch(error => {
+        console.log(error);
+    });
+}
+
+function listenToListingEvents(url){
+    const events = new EventSource(url);
+    events.addEventListener('bid', event => {
+        const data = JSON.parse(event.data);
+        bidPrice.innerText = `$ ${data['price']}`;
+        if (data['bidder'] !== bidPrice.dataset.username){
+            const flash = addFlashMessage('alert-info', `${data['bidder']} bid $ ${data['price']}`);
+            removeFlashMessage(flash);
+        }
+    });
+    // opening or closing the auction changes the whole bid section, render it again
+    events.addEventListener('state', () => location.reload());
+}
+
 function addFlashMessage(class_name, text){
     const flash = document.createElement('p');
     flash.className = `alert ${class_name}`;
@@ -207,13 +279,19 @@ const flashMessage = document.querySelector('.flash_message');
 const watchlistButton = document.querySelector('#watchlist');
 let bidButton = document.querySelector('#bid_button');
 const bid = document.querySelector('#bid');
+const maxBid = document.querySelector('#max_bid');
 const bidPrice = document.querySelector('#bid_price');
 const bid_div = document.querySelector('.bids');
 const bid_text = document.querySelector('.bid-text');
 const commentSection = document.querySelector('#comment_section');
 let commentButton = document.querySelector('#comment_button');
 const comment = document.querySelector('#comment');
+const moreCommentsButton = document.querySelector('#more_comments');
+const priceHistory = document.querySelector('#price_history');
 // let auctionButton = document.querySelector('#auction_state');
+if (bidPrice && bidPrice.dataset.events) listenToListingEvents(bidPrice.dataset.events);
+if (priceHistory) drawPriceHistory(priceHistory);
+if (moreCommentsButton) moreCommentsButton.addEventListener('click', () => loadMoreComments(moreCommentsButton));
 watchlistButton.addEventListener('click', () => changeWatchlistState(watchlistButton.dataset.action));
 bidButton.addEventListener('click', () => changeBidState(bidButton.dataset.action));
 commentButton.addEventListener('click', () => addComment(commentButton.dataset.action));
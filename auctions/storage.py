@@ -0,0 +1,90 @@
+import gzip
+import hashlib
+import os
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:
+    # optional, only gzip siblings are written without it
+    brotli = None
+
+# text assets worth compressing, images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.html')
+# name.0123456789ab.ext: both storages below put 12 hex digits of the content's md5 before the extension
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+def write_compressed_siblings(path: str) -> list:
+    """
+    write path.gz (and path.br when brotli is installed) next to a file, when they're smaller\n
+    returns the paths written
+    """
+    with open(path, 'rb') as original:
+        content = original.read()
+    compressors = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+    written = []
+    for suffix, compress in compressors:
+        compressed = compress(content)
+        if len(compressed) < len(content):
+            with open(path + suffix, 'wb') as sibling:
+                sibling.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic storage: content-hashed copies of every file (main.3f2a9c1b0d4e.js) that can be
+    cached forever, plus precompressed .gz/.br siblings of the text ones so no request compresses anything
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        # compressed after every pass, a css file is hashed again once the urls in it are
+        for hashed_name in set(hashed_names):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                for path in write_compressed_siblings(self.path(hashed_name)):
+                    yield hashed_name, os.path.basename(path), True
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """
+    uploads are saved as name.<content hash>.ext: a url never changes content, so it can be cached
+    forever, and uploading the same picture twice stores it once
+    """
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    @staticmethod
+    def hashed_name(name: str, content) -> str:
+        """
+        Examples:
+            'dragon egg.png' -> 'dragon egg.1f3870be274f.png'
+        """
+        md5 = hashlib.md5(usedforsecurity=False)
+        content.seek(0)
+        for chunk in content.chunks():
+            md5.update(chunk)
+        content.seek(0)
+        stem, extension = os.path.splitext(name)
+        return f"{stem}.{md5.hexdigest()[:12]}{extension}"
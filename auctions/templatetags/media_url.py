@@ -0,0 +1,26 @@
+from urllib.parse import unquote
+
+from django import template
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+register = template.Library()
+
+@register.filter(name="media_url")
+def media_url(picture) -> str:
+    """
+    url of an uploaded picture or image variant, however its path was stored\n
+    Examples:
+        '/auctions/ai-images/ethereal_egg.png' -> /auctions/ai-images/ethereal_egg.png\n
+        '/auctions/ai-images/death%20card.png' -> /auctions/ai-images/death%20card.png\n
+        '\\auctions\\ai-images\\death card.png' -> /auctions/ai-images/death%20card.png\n
+        'auctions/ai-images/variants/egg-thumbnail.webp' -> /auctions/ai-images/variants/egg-thumbnail.webp
+    """
+    if not picture:
+        return ''
+    # pictures are stored as the url default_storage gave them, already quoted
+    name = unquote(str(picture)).replace('\\', '/').lstrip('/')
+    prefix = settings.MEDIA_URL.lstrip('/')
+    if name.startswith(prefix):
+        name = name[len(prefix):]
+    return default_storage.url(name)
@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from auctions.bidding import accept_bid, accept_bids, open_listing
+from auctions.helpers import ListingNotActive, BidTooLow, BidOnOwnListing, MaxBidTooLow
+from auctions.models import User, Listing, Bid
+
+
+class AcceptBidTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="Alvo Dumbledore")
+        self.bidder = User.objects.create_user(username="Tom Riddle")
+        self.listing = open_listing({'title': "Invisibility Cloak", 'author': self.author}, 1000)
+
+    def assertListing(self, price: int, bidder, bid_count: int):
+        listing = Listing.objects.get(pk=self.listing.pk)
+        self.assertEqual(listing.current_price, price)
+        self.assertEqual(listing.current_bidder, bidder)
+        self.assertEqual(listing.bid_count, bid_count)
+        self.assertEqual(Bid.objects.filter(listing=listing).count(), bid_count)
+
+    def test_higher_bid_is_accepted(self):
+        bid = accept_bid(self.listing.pk, self.bidder, 1500)
+
+        self.assertEqual((bid.price, bid.user), (1500, self.bidder))
+        self.assertListing(1500, self.bidder, 2)
+
+    def test_equal_or_lower_bid_is_rejected(self):
+        for price in (1000, 999):
+            with self.subTest(price=price), self.assertRaises(BidTooLow):
+                accept_bid(self.listing.pk, self.bidder, price)
+        self.assertListing(1000, self.author, 1)
+
+    def test_bid_on_closed_listing_is_rejected(self):
+        Listing.objects.filter(pk=self.listing.pk).update(active=False)
+
+        with self.assertRaises(ListingNotActive):
+            accept_bid(self.listing.pk, self.bidder, 1500)
+        self.assertListing(1000, self.author, 1)
+
+    def test_bid_past_end_time_is_rejected(self):
+        Listing.objects.filter(pk=self.listing.pk).update(end_time=timezone.now() - timedelta(seconds=1))
+
+        with self.assertRaises(ListingNotActive):
+            accept_bid(self.listing.pk, self.bidder, 1500)
+        self.assertListing(1000, self.author, 1)
+
+    def test_author_cannot_bid_on_own_listing(self):
+        with self.assertRaises(BidOnOwnListing):
+            accept_bid(self.listing.pk, self.author, 1500)
+        self.assertListing(1000, self.author, 1)
+
+    def test_author_bids_in_a_batch_are_rejected(self):
+        results, leading = accept_bids(self.author, [(self.listing.pk, 1500)])
+
+        self.assertEqual(results, [{'listing_id': self.listing.pk, 'price': 1500, 'status': 'own_listing'}])
+        self.assertEqual(leading, {})
+        self.assertListing(1000, self.author, 1)
+
+    def test_bid_on_missing_listing(self):
+        with self.assertRaises(Listing.DoesNotExist):
+            accept_bid(0, self.bidder, 1500)
+
+    def test_late_bid_extends_end_time(self):
+        """
+        a bid in the last AUCTION_SOFT_CLOSE_SECONDS leaves that long to answer it
+        """
+        Listing.objects.filter(pk=self.listing.pk).update(end_time=timezone.now() + timedelta(seconds=5))
+
+        before = timezone.now()
+        accept_bid(self.listing.pk, self.bidder, 1500)
+        end_time = Listing.objects.get(pk=self.listing.pk).end_time
+
+        self.assertGreaterEqual(end_time, before + timedelta(seconds=settings.AUCTION_SOFT_CLOSE_SECONDS))
+        self.assertLessEqual(end_time, timezone.now() + timedelta(seconds=settings.AUCTION_SOFT_CLOSE_SECONDS))
+
+    def test_early_bid_keeps_end_time(self):
+        end_time = timezone.now() + timedelta(days=1)
+        Listing.objects.filter(pk=self.listing.pk).update(end_time=end_time)
+
+        accept_bid(self.listing.pk, self.bidder, 1500)
+
+        self.assertEqual(Listing.objects.get(pk=self.listing.pk).end_time, end_time)
+
+
+class ProxyBidTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="Alvo Dumbledore")
+        self.harry = User.objects.create_user(username="Harry Potter")
+        self.draco = User.objects.create_user(username="Draco Malfoy")
+        self.listing = open_listing({'title': "Nimbus 2000", 'author': self.author}, 1000)
+
+    def assertLeading(self, price: int, bidder):
+        listing = Listing.objects.get(pk=self.listing.pk)
+        self.assertEqual((listing.current_price, listing.current_bidder), (price, bidder))
+        self.assertEqual(listing.bid_count, Bid.objects.filter(listing=listing).count())
+        # the history still only goes up
+        prices = list(Bid.objects.filter(listing=listing).order_by('id').values_list('price', flat=True))
+        self.assertEqual(prices, sorted(set(prices)))
+
+    def test_proxy_outbids_a_lower_bid(self):
+        accept_bid(self.listing.pk, self.harry, 1100, max_price=5000)
+
+        leading = accept_bid(self.listing.pk, self.draco, 2000)
+
+        self.assertEqual((leading.price, leading.user), (2000 + settings.BID_INCREMENT, self.harry))
+        self.assertLeading(2000 + settings.BID_INCREMENT, self.harry)
+
+    def test_higher_proxy_wins_and_pays_one_increment_over_the_other(self):
+        accept_bid(self.listing.pk, self.harry, 1100, max_price=5000)
+
+        leading = accept_bid(self.listing.pk, self.draco, 1200, max_price=3000)
+
+        self.assertEqual((leading.price, leading.user), (3000 + settings.BID_INCREMENT, self.harry))
+        self.assertLeading(3000 + settings.BID_INCREMENT, self.harry)
+        # the runner-up bid its whole maximum on the way
+        self.assertTrue(Bid.objects.filter(listing=self.listing, user=self.draco, price=3000).exists())
+
+    def test_tie_goes_to_the_earlier_proxy(self):
+        accept_bid(self.listing.pk, self.harry, 1100, max_price=5000)
+
+        leading = accept_bid(self.listing.pk, self.draco, 1200, max_price=5000)
+
+        self.assertEqual((leading.price, leading.user), (5000, self.harry))
+        self.assertLeading(5000, self.harry)
+
+    def test_proxy_never_bids_over_its_maximum(self):
+        accept_bid(self.listing.pk, self.harry, 1100, max_price=3000)
+
+        leading = accept_bid(self.listing.pk, self.draco, 2950)
+        # one increment over 2950 would be 3050, the proxy stops at its maximum
+        self.assertEqual((leading.price, leading.user), (3000, self.harry))
+
+        leading = accept_bid(self.listing.pk, self.draco, 3500)
+        self.assertEqual((leading.price, leading.user), (3500, self.draco))
+        self.assertLeading(3500, self.draco)
+        self.assertFalse(Bid.objects.filter(listing=self.listing, user=self.harry, price__gt=3000).exists())
+
+    def test_proxy_below_the_bid_is_rejected(self):
+        with self.assertRaises(MaxBidTooLow):
+            accept_bid(self.listing.pk, self.harry, 2000, max_price=1500)
+        self.assertLeading(1000, self.author)
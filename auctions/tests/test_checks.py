@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase, override_settings
+
+from auctions.checks import check_shared_cache
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+SHARED_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/auctions-test-cache'}}
+
+
+class SharedCacheCheckTestCase(SimpleTestCase):
+    @override_settings(DEBUG=False, CACHES=LOCMEM_CACHE)
+    def test_locmem_in_production_warns(self):
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['auctions.W001'])
+
+    @override_settings(DEBUG=True, CACHES=LOCMEM_CACHE)
+    def test_locmem_in_debug_is_fine(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(DEBUG=False, CACHES=SHARED_CACHE)
+    def test_shared_cache_is_fine(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+
+from auctions.helpers import format_cents, format_to_currency, parse_bid_batch
+from auctions.templatetags.price_format import format_to_currency as currency_format
+
+
+class FormatToCurrencyTestCase(SimpleTestCase):
+    def test_docstring_examples(self):
+        self.assertEqual(format_to_currency('89'), '0.89')
+        self.assertEqual(format_to_currency('758954'), '7,589.54')
+        self.assertEqual(format_to_currency('only_chars'), '0.00')
+
+    def test_cents(self):
+        self.assertEqual(format_to_currency(5), '0.05')
+        self.assertEqual(format_to_currency(100), '1.00')
+        self.assertEqual(format_to_currency(100_000_000), '1,000,000.00')
+
+    def test_strings_and_ints_agree(self):
+        for cents in (0, 7, 99, 1000, 123456, 100_000_000, 98765432101):
+            with self.subTest(cents=cents):
+                self.assertEqual(format_to_currency(str(cents)), format_to_currency(cents))
+                self.assertEqual(format_to_currency(cents), format_cents(cents))
+
+    def test_comma_is_the_thousands_separator(self):
+        # the old template filter used '.', views and templates now print the same thing
+        self.assertEqual(format_to_currency(123456789012), '1,234,567,890.12')
+        self.assertEqual(format_to_currency('$ 1.234.567,89'), '1,234,567.89')
+        self.assertEqual(currency_format(123456789012), '1,234,567,890.12')
+
+
+class ParseBidBatchTestCase(SimpleTestCase):
+    def test_cents_and_currency_strings(self):
+        self.assertEqual(
+            parse_bid_batch(b'[[3, 7589], {"listing_id": 4, "price": "$ 12.50"}]'),
+            [(3, 7589), (4, 1250)],
+        )
+
+    def test_json_lines(self):
+        self.assertEqual(parse_bid_batch(b'[3, 7589]\n[4, "foo"]', 'application/x-ndjson'), [(3, 7589), None])
+
+    def test_floats_are_invalid(self):
+        # 12.5 isn't 125 cents
+        self.assertEqual(parse_bid_batch(b'[[3, 12.5], [4, 12.0], {"listing_id": 5, "price": 1e3}]'), [None, None, None])
+
+    def test_other_prices_are_invalid(self):
+        self.assertEqual(parse_bid_batch(b'[[3, true], [4, null], [5, [1250]], [6]]'), [None, None, None, None])
+
+    def test_not_a_list(self):
+        with self.assertRaises(ValueError):
+            parse_bid_batch(b'{"listing_id": 3, "price": 7589}')
@@ -0,0 +1,31 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from auctions.bidding import accept_bid, open_listing
+from auctions.models import User, Listing
+
+
+class ClosedListingPageTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="Alvo Dumbledore")
+        self.bidder = User.objects.create_user(username="Harry Potter")
+        self.listing = open_listing({'title': "Sorting Hat", 'author': self.author}, 1000)
+
+    def page(self, user) -> str:
+        self.client.force_login(user)
+        return self.client.get(reverse("listing_page", args=[self.listing.id])).content.decode()
+
+    def test_winner_is_told(self):
+        accept_bid(self.listing.pk, self.bidder, 1500)
+        Listing.objects.get(pk=self.listing.pk).close_auction()
+
+        self.assertIn("you won!", self.page(self.bidder))
+        self.assertNotIn("you won!", self.page(self.author))
+
+    def test_author_of_an_auction_without_bids_didnt_win(self):
+        Listing.objects.get(pk=self.listing.pk).close_auction()
+
+        self.assertNotIn("you won!", self.page(self.author))
+        self.assertNotIn("you won!", self.page(self.bidder))
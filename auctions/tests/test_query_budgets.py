@@ -0,0 +1,71 @@
+import os
+import unittest
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from auctions.management.commands.check_query_budgets import QUERY_BUDGETS, seed_budget_data
+from auctions.trending import Leaderboard, event_score
+
+
+class QueryBudgetMixin:
+    """
+    the views must run as many SQL queries on `size` listings as on 10: one more is an N+1
+    """
+    size = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.listing, cls.category = seed_budget_data(cls.size)
+
+    def setUp(self):
+        # cached fragments would hide the queries behind them
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertWithinBudget(self, view: str, request):
+        with self.assertNumQueries(QUERY_BUDGETS[view]):
+            response = request()
+        self.assertEqual(response.status_code, 200)
+
+    def test_index(self):
+        self.assertWithinBudget("index", lambda: self.client.get(reverse("index")))
+
+    def test_category(self):
+        self.assertWithinBudget("category", lambda: self.client.get(reverse("category", args=[self.category.id])))
+
+    def test_listing_page(self):
+        self.assertWithinBudget("listing_page", lambda: self.client.get(reverse("listing_page", args=[self.listing.id])))
+
+    def test_comment_page(self):
+        self.assertWithinBudget("comment_page", lambda: self.client.get(reverse("comment_page", args=[self.listing.id])))
+
+    def test_watchlist(self):
+        self.assertWithinBudget("watchlist", lambda: self.client.get(reverse("watchlist")))
+
+    def test_trending(self):
+        # a leaderboard that isn't loaded yet, so reading it from the table is counted
+        leaderboard = Leaderboard()
+        leaderboard.record(self.listing.id, event_score("bid"))
+        with mock.patch("auctions.trending.get_leaderboard", return_value=leaderboard):
+            self.assertWithinBudget("trending", lambda: self.client.get(reverse("trending")))
+
+    def test_place_bid(self):
+        self.assertWithinBudget("place_bid", lambda: self.client.post(
+            reverse("place_bid", args=[self.listing.id]), {"bid": str(self.listing.current_price + 1)}, content_type="application/json"
+        ))
+
+
+class SmallCatalogQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    size = 10
+
+
+class LargeCatalogQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    size = 1_000
+
+
+@unittest.skipUnless(os.environ.get("QUERY_BUDGET_100K") == "1", "set QUERY_BUDGET_100K=1 to seed 100k listings")
+class HugeCatalogQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    size = 100_000
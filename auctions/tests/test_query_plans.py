@@ -0,0 +1,21 @@
+from django.db import connection
+from django.test import TestCase
+
+from auctions.management.commands.check_query_plans import FULL_SCAN, hot_queries, explain, full_scans, uses_index
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    the hot queries must read through their index, a migration that loses one fails here
+    """
+
+    def setUp(self):
+        if connection.vendor not in FULL_SCAN:
+            self.skipTest(f"no plan rules for {connection.vendor}")
+
+    def test_hot_queries_use_their_index(self):
+        for name, (queryset, index) in hot_queries().items():
+            with self.subTest(name):
+                plan = explain(queryset)
+                self.assertEqual(full_scans(plan), [], f"{name} reads a whole table or sorts its rows:\n{plan}")
+                self.assertTrue(uses_index(plan, index), f"{name} doesn't use {index}:\n{plan}")
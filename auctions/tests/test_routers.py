@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from auctions.models import User, Listing
+from auctions.routers import PrimaryReplicaRouter, ReplicaRoutingMiddleware, read_from_replica
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class PrimaryReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.reads = {}
+
+    def request(self, view, pinned: bool = False) -> HttpResponse:
+        request = RequestFactory().get("/")
+        if pinned:
+            request.COOKIES[settings.REPLICA_PIN_COOKIE] = '1'
+        return ReplicaRoutingMiddleware(view)(request)
+
+    def record_reads(self, request):
+        for model in (Listing, User):
+            self.reads[model] = self.router.db_for_read(model)
+        return HttpResponse()
+
+    def test_read_only_views_read_listings_from_a_replica(self):
+        self.request(read_from_replica(self.record_reads))
+        self.assertEqual(self.reads, {Listing: 'replica_0', User: 'default'})
+
+    def test_other_views_read_from_the_primary(self):
+        self.request(self.record_reads)
+        self.assertEqual(self.reads, {Listing: 'default', User: 'default'})
+
+    def test_pinned_user_reads_from_the_primary(self):
+        self.request(read_from_replica(self.record_reads), pinned=True)
+        self.assertEqual(self.reads, {Listing: 'default', User: 'default'})
+
+    def test_write_pins_the_user(self):
+        def write(request):
+            self.assertEqual(self.router.db_for_write(Listing), 'default')
+            return HttpResponse()
+
+        response = self.request(write)
+
+        self.assertEqual(response.cookies[settings.REPLICA_PIN_COOKIE].value, '1')
+        self.assertTrue(response.cookies[settings.REPLICA_PIN_COOKIE]['httponly'])
+
+    def test_read_doesnt_pin_the_user(self):
+        response = self.request(read_from_replica(self.record_reads))
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_without_replicas_everything_is_read_from_the_primary(self):
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.request(read_from_replica(self.record_reads))
+        self.assertEqual(self.reads, {Listing: 'default', User: 'default'})
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from auctions.bidding import accept_bid, open_listing
+from auctions.models import User, Listing
+from auctions.scheduler import AuctionScheduler, process_local_backends
+
+SHARED_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/auctions-test-cache'}}
+
+
+class ProcessLocalBackendsTestCase(SimpleTestCase):
+    @override_settings(CACHES=SHARED_CACHE, EVENT_BROKER='auctions.events.Broker')
+    def test_shared_backends(self):
+        self.assertEqual(process_local_backends(), [])
+
+    @override_settings(EVENT_BROKER='auctions.events.InProcessBroker')
+    def test_standalone_scheduler_refuses_process_local_backends(self):
+        self.assertIn('EVENT_BROKER', process_local_backends())
+        with self.assertRaisesMessage(CommandError, "EVENT_BROKER"):
+            call_command("run_auction_scheduler")
+
+
+class AuctionSchedulerTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="Alvo Dumbledore")
+        self.bidder = User.objects.create_user(username="Harry Potter")
+        self.now = timezone.now()
+
+    def timed_listing(self, title: str, bid: int | None = None, ends_in: float = -1) -> Listing:
+        listing = open_listing({'title': title, 'author': self.author, 'end_time': self.now + timedelta(hours=1)}, 1000)
+        if bid:
+            accept_bid(listing.pk, self.bidder, bid)
+        # moved after the bids, a bid past the end time would be refused
+        Listing.objects.filter(pk=listing.pk).update(end_time=self.now + timedelta(seconds=ends_in))
+        return Listing.objects.get(pk=listing.pk)
+
+    def loaded_scheduler(self, **kwargs) -> AuctionScheduler:
+        scheduler = AuctionScheduler(**kwargs)
+        scheduler.load()
+        return scheduler
+
+    def test_due_auctions_are_closed_with_their_winner(self):
+        won = self.timed_listing("Elder Wand", bid=1500)
+        unsold = self.timed_listing("Resurrection Stone")
+        running = self.timed_listing("Invisibility Cloak", bid=1500, ends_in=3600)
+
+        closed = self.loaded_scheduler().close_due(self.now)
+
+        self.assertEqual(sorted(closed), sorted([won.pk, unsold.pk]))
+        won, unsold, running = (Listing.objects.get(pk=listing.pk) for listing in (won, unsold, running))
+        self.assertEqual((won.active, won.winner), (False, self.bidder))
+        # the author's starting price isn't a win
+        self.assertEqual((unsold.active, unsold.winner), (False, None))
+        self.assertEqual((running.active, running.winner), (True, None))
+
+    def test_extended_auction_goes_back_on_the_heap(self):
+        listing = self.timed_listing("Time Turner", bid=1500)
+        scheduler = self.loaded_scheduler()
+        # a soft-close bid pushed the deadline after the scheduler loaded it
+        extended_to = self.now + timedelta(seconds=120)
+        Listing.objects.filter(pk=listing.pk).update(end_time=extended_to)
+
+        self.assertEqual(scheduler.close_due(self.now), [])
+        self.assertTrue(Listing.objects.get(pk=listing.pk).active)
+        self.assertEqual(scheduler.deadlines, [(extended_to, listing.pk)])
+
+        self.assertEqual(scheduler.close_due(extended_to), [listing.pk])
+
+    def test_auction_closed_by_hand_is_dropped(self):
+        listing = self.timed_listing("Marauder's Map", bid=1500)
+        scheduler = self.loaded_scheduler()
+        listing.close_auction()
+
+        self.assertEqual(scheduler.close_due(self.now), [])
+        self.assertEqual(scheduler.deadlines, [])
+
+    def test_closes_batch_size_auctions_per_query(self):
+        listings = [self.timed_listing(f"Chocolate Frog {i}", bid=1500) for i in range(5)]
+        scheduler = self.loaded_scheduler(batch_size=2)
+
+        with CaptureQueriesContext(connection) as queries:
+            closed = scheduler.close_due(self.now)
+
+        self.assertEqual(sorted(closed), [listing.pk for listing in listings])
+        closing = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "auctions_listing"')]
+        self.assertEqual(len(closing), 3)
+        self.assertFalse(Listing.objects.filter(pk__in=closed, active=True).exists())
+
+    def test_new_auctions_are_discovered(self):
+        scheduler = self.loaded_scheduler()
+        self.assertEqual(scheduler.deadlines, [])
+
+        listing = self.timed_listing("Philosopher's Stone", bid=1500)
+        self.timed_listing("Pensieve", ends_in=3600)
+        untimed = open_listing({'title': "Nimbus 2000", 'author': self.author}, 1000)
+        scheduler.discover()
+
+        self.assertEqual(scheduler.last_seen_id, untimed.pk)
+        self.assertEqual(len(scheduler.deadlines), 2)
+        self.assertEqual(scheduler.close_due(self.now), [listing.pk])
@@ -0,0 +1,135 @@
+import unittest
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from auctions.bidding import open_listing
+from auctions.models import User, Listing, Comments
+from auctions.search import reinstall_after_migrate, search_listings
+
+TRIGGERS = {
+    f"auctions_{table}_fts_{action}" for table in ('listing', 'comments') for action in ('insert', 'delete', 'update')
+}
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "FTS5 index of SQLite")
+class SqliteSearchTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="Alvo Dumbledore")
+
+    def listing(self, title: str, description: str = "A wizarding item") -> Listing:
+        return open_listing({'title': title, 'description': description, 'author': self.author}, 1000)
+
+    def comment(self, listing: Listing, text: str) -> Comments:
+        return Comments.objects.create(text=text, user=self.author, listing=listing)
+
+    def found(self, query: str, **kwargs) -> list:
+        return [listing.id for listing in search_listings(query, **kwargs).items]
+
+    def triggers(self) -> set:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'auctions_%_fts_%'")
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_listing_triggers(self):
+        listing = self.listing("Phoenix feather", "Found in a cauldron")
+        self.assertEqual(self.found("phoenix"), [listing.id])
+        self.assertEqual(self.found("cauldron"), [listing.id])
+
+        Listing.objects.filter(pk=listing.pk).update(title="Dragon scale")
+        self.assertEqual(self.found("phoenix"), [])
+        self.assertEqual(self.found("dragon"), [listing.id])
+
+        Listing.objects.filter(pk=listing.pk).delete()
+        self.assertEqual(self.found("dragon"), [])
+
+    def test_comment_triggers(self):
+        listing = self.listing("Broomstick")
+        comment = self.comment(listing, "It flies faster than a hippogriff")
+        self.assertEqual(self.found("hippogriff"), [listing.id])
+
+        Comments.objects.filter(pk=comment.pk).update(text="It flies faster than a thestral")
+        self.assertEqual(self.found("hippogriff"), [])
+        self.assertEqual(self.found("thestral"), [listing.id])
+
+        Comments.objects.filter(pk=comment.pk).delete()
+        self.assertEqual(self.found("thestral"), [])
+
+    def test_comments_can_be_left_out(self):
+        listing = self.listing("Broomstick")
+        self.comment(listing, "It flies faster than a hippogriff")
+
+        self.assertEqual(self.found("hippogriff", include_comments=False), [])
+
+    def test_post_migrate_reinstalls_dropped_triggers(self):
+        self.assertEqual(self.triggers(), TRIGGERS)
+        # what a migration remaking auctions_listing does to its triggers
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER auctions_listing_fts_insert")
+            cursor.execute("DROP TRIGGER auctions_listing_fts_update")
+
+        reinstall_after_migrate(sender=None, using='default')
+
+        self.assertEqual(self.triggers(), TRIGGERS)
+        listing = self.listing("Mandrake root")
+        self.assertEqual(self.found("mandrake"), [listing.id])
+
+    def test_title_before_description_before_comments(self):
+        in_comment = self.listing("Cauldron", "Pewter, standard size 2")
+        self.comment(in_comment, "Perfect for a basilisk antidote")
+        in_description = self.listing("Book", "Everything about the basilisk of the chamber")
+        in_title = self.listing("Basilisk fang", "Slightly used")
+
+        self.assertEqual(self.found("basilisk"), [in_title.id, in_description.id, in_comment.id])
+
+    def test_listing_with_many_matching_comments_counts_once(self):
+        # the short comments rank best, ten hits of one listing mustn't take the other listings' places
+        popular = self.listing("Golden egg", "Sings under water")
+        for i in range(10):
+            self.comment(popular, "Mermaids!")
+        others = [self.listing(f"Lake item {i}") for i in range(3)]
+        for listing in others:
+            self.comment(listing, "Seen near the mermaids at the bottom of the Black Lake last winter")
+
+        first = search_listings("mermaid", page_size=2)
+        second = search_listings("mermaid", first.next_page, page_size=2)
+
+        self.assertEqual([listing.id for listing in first.items][0], popular.id)
+        self.assertEqual(
+            sorted(listing.id for listing in first.items + second.items), sorted([popular.id] + [listing.id for listing in others])
+        )
+
+    def test_pages(self):
+        listings = [self.listing(f"Remembrall {i}") for i in range(5)]
+
+        pages, page_number = [], 1
+        while page_number:
+            page = search_listings("remembrall", page_number, page_size=2)
+            pages.append([listing.id for listing in page.items])
+            page_number = page.next_page
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sorted(sum(pages, [])), [listing.id for listing in listings])
+
+    def test_words_are_escaped(self):
+        listing = self.listing("Ice-cream cone")
+
+        self.assertEqual(self.found('ice-cream "co'), [listing.id])
+        self.assertEqual(self.found('"'), [])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "FTS5 index of SQLite")
+class SearchViewTestCase(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username="Alvo Dumbledore")
+        for i in range(settings.LISTINGS_PAGE_SIZE + 1):
+            open_listing({'title': f"Remembrall {i}", 'author': author}, 1000)
+
+    def test_next_page_keeps_the_comments_option(self):
+        response = self.client.get(reverse("search"), {"q": "remembrall", "comments": "off"})
+        self.assertContains(response, 'href="?q=remembrall&comments=off&page=2"')
+
+        response = self.client.get(reverse("search"), {"q": "remembrall"})
+        self.assertContains(response, 'href="?q=remembrall&page=2"')
@@ -0,0 +1,77 @@
+import json
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from auctions.bidding import open_listing
+from auctions.models import User, Watchlist
+
+
+class WatchlistTestCase(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username="Alvo Dumbledore")
+        self.user = User.objects.create_user(username="Harry Potter")
+        self.listings = [open_listing({'title': f"Chocolate Frog {i}", 'author': author}, 100) for i in range(3)]
+        self.client.force_login(self.user)
+
+    def watched(self) -> set:
+        return set(Watchlist.objects.filter(user=self.user).values_list('listing_id', flat=True))
+
+    def change_state(self, listing_id: int, new_state: str):
+        return self.client.post(
+            reverse("watchlist_change_state", args=[listing_id]), {"new_state": new_state}, content_type="application/json"
+        )
+
+    def bulk(self, data: dict):
+        return self.client.post(reverse("watchlist_bulk"), data, content_type="application/json")
+
+    def test_repeated_add_keeps_one_entry(self):
+        listing = self.listings[0]
+        for _ in range(2):
+            response = self.change_state(listing.id, "in_watchlist")
+            self.assertEqual(response.json(), {'state': "add"})
+        self.assertEqual(Watchlist.objects.filter(user=self.user, listing=listing).count(), 1)
+
+    def test_repeated_remove_keeps_none(self):
+        listing = self.listings[0]
+        Watchlist.objects.create(user=self.user, listing=listing)
+        for _ in range(2):
+            response = self.change_state(listing.id, "not_in_watchlist")
+            self.assertEqual(response.json(), {'state': "delete"})
+        self.assertEqual(self.watched(), set())
+
+    def test_missing_listing_is_404(self):
+        for new_state in ("in_watchlist", "not_in_watchlist"):
+            with self.subTest(new_state=new_state):
+                self.assertEqual(self.change_state(999_999_999, new_state).status_code, 404)
+        self.assertEqual(self.watched(), set())
+
+    def test_bulk_add_and_remove(self):
+        first, second, third = self.listings
+        Watchlist.objects.create(user=self.user, listing=first)
+
+        response = self.bulk({"add": [first.id, second.id, 999_999_999], "remove": [first.id, third.id]})
+
+        self.assertEqual(response.json(), {'added': 2, 'removed': 1})
+        self.assertEqual(self.watched(), {first.id, second.id})
+
+    def test_bulk_set(self):
+        first, second, third = self.listings
+        Watchlist.objects.create(user=self.user, listing=first)
+        Watchlist.objects.create(user=self.user, listing=second)
+
+        response = self.bulk({"set": [second.id, third.id]})
+
+        self.assertEqual(response.json(), {'added': 1, 'removed': 1})
+        self.assertEqual(self.watched(), {second.id, third.id})
+
+    @override_settings(WATCHLIST_BULK_MAX=2)
+    def test_bulk_max(self):
+        ids = [listing.id for listing in self.listings]
+        for key in ("add", "remove", "set"):
+            with self.subTest(key=key):
+                response = self.bulk({key: ids})
+                self.assertEqual(response.status_code, 403)
+                self.assertIn(str(settings.WATCHLIST_BULK_MAX), response.json()['error'])
+        self.assertEqual(self.watched(), set())
@@ -0,0 +1,220 @@
+import atexit
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+
+from .models import Listing, TrendingScore
+from .retry import retry_on_lock
+
+logger = logging.getLogger(__name__)
+
+# what a listing with no activity scores, low enough that log_add() of anything else is that thing
+NO_SCORE = -1e300
+
+
+def event_score(kind: str, when: float | None = None) -> float:
+    """
+    the log score of one bid or comment made at `when` (seconds since 1970, now by default)\n
+    A listing's trend is the sum of weight * 2^(-age / TRENDING_HALF_LIFE) of its events. All
+    listings decay at the same rate, so they rank the same by weight * 2^(time / half life):
+    an event is worth more the later it happens and nothing already stored ever changes.
+    That grows without bound, hence the log.\n
+    Examples:
+        event_score('bid', 0) -> 0.0\n
+        event_score('comment', 3600) -> ln(0.5) + ln(2) = 0.0 with a half life of an hour
+    """
+    when = time.time() if when is None else when
+    return math.log(settings.TRENDING_WEIGHTS[kind]) + when * math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+def log_add(a: float, b: float) -> float:
+    """
+    ln(e^a + e^b) without overflowing, the sum of two scores
+    """
+    return max(a, b) + math.log1p(math.exp(-abs(a - b)))
+
+
+def current_value(score: float, now: float | None = None) -> float:
+    """
+    a score as what it's worth now: the decayed sum of weights, 1.0 for a bid made right now
+    """
+    now = time.time() if now is None else now
+    return math.exp(score - now * math.log(2) / settings.TRENDING_HALF_LIFE)
+
+
+def _log_add_column(score: float):
+    return Greatest(F('score'), Value(score)) + Ln(Value(1.0) + Exp(-Abs(F('score') - Value(score))))
+
+
+@retry_on_lock
+def persist_scores(scores: dict) -> int:
+    """
+    add {listing_id: score} to the stored scores, in one transaction\n
+    Added with log_add in SQL rather than overwritten, so the events each process saw add up.
+    Listings deleted since are skipped. returns the number of scores written
+    """
+    with transaction.atomic():
+        listing_ids = list(Listing.objects.filter(pk__in=scores).values_list('pk', flat=True))
+        # rows start at NO_SCORE so a missing one is created and added to the same way
+        TrendingScore.objects.bulk_create(
+            [TrendingScore(listing_id=pk, score=NO_SCORE) for pk in listing_ids], ignore_conflicts=True
+        )
+        for start in range(0, len(listing_ids), 500):
+            batch = listing_ids[start:start + 500]
+            TrendingScore.objects.filter(pk__in=batch).update(
+                score=Case(*(When(pk=pk, then=_log_add_column(scores[pk])) for pk in batch), default=F('score'))
+            )
+    return len(listing_ids)
+
+
+class Leaderboard:
+    """
+    the TRENDING_CAPACITY hottest listings of this process, kept sorted in memory\n
+    Every bid and comment adds its event_score to its listing, O(log n) to find it in the ranking
+    plus moving it up the list, so top(n) is a slice of n entries whatever the size of the catalog.
+    The increments are kept apart too and flush() adds them to TrendingScore, then takes the
+    ranking from the table again so the events of the other processes show up.\n
+    Examples:
+        leaderboard.record(3, event_score('bid'))\n
+        leaderboard.top(20) -> [(3, 1236580.4), (7, 1236579.9), ...]
+    """
+
+    def __init__(self, capacity: int | None = None):
+        self.capacity = capacity or settings.TRENDING_CAPACITY
+        self.lock = threading.Lock()
+        self.scores = {}
+        # (-score, listing_id), the hottest first
+        self.ranking = []
+        # what was recorded since the last flush, by listing
+        self.pending = {}
+        self.loaded = False
+
+    def _set(self, listing_id: int, score: float):
+        old = self.scores.get(listing_id)
+        if old is not None:
+            del self.ranking[bisect_left(self.ranking, (-old, listing_id))]
+        self.scores[listing_id] = score
+        insort(self.ranking, (-score, listing_id))
+        if len(self.ranking) > self.capacity:
+            _, dropped = self.ranking.pop()
+            del self.scores[dropped]
+
+    def record(self, listing_id: int, score: float):
+        with self.lock:
+            self._set(listing_id, log_add(self.scores.get(listing_id, NO_SCORE), score))
+            self.pending[listing_id] = log_add(self.pending.get(listing_id, NO_SCORE), score)
+
+    def top(self, n: int) -> list:
+        """
+        the n hottest listings as (listing_id, score)
+        """
+        if not self.loaded:
+            self.load()
+        with self.lock:
+            return [(listing_id, -score) for score, listing_id in self.ranking[:n]]
+
+    def load(self):
+        """
+        take the ranking from TrendingScore, plus what was recorded here and isn't stored yet
+        """
+        stored = list(TrendingScore.objects.order_by('-score').values_list('listing_id', 'score')[:self.capacity])
+        with self.lock:
+            local = self.scores
+            self.scores, self.ranking = {}, []
+            for listing_id, score in stored:
+                self._set(listing_id, log_add(score, self.pending.get(listing_id, NO_SCORE)))
+            # recorded here but not in the stored top: what this process knows of them is all there is
+            for listing_id in self.pending.keys() - self.scores.keys():
+                if listing_id in local:
+                    self._set(listing_id, local[listing_id])
+            self.loaded = True
+
+    def flush(self):
+        """
+        add the pending increments to TrendingScore, then load the ranking again
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if pending:
+            try:
+                persist_scores(pending)
+            except Exception:
+                # kept for the next flush
+                with self.lock:
+                    for listing_id, score in pending.items():
+                        self.pending[listing_id] = log_add(self.pending.get(listing_id, NO_SCORE), score)
+                raise
+        self.load()
+
+
+class Flusher(threading.Thread):
+    """
+    flushes the process's leaderboard every TRENDING_FLUSH_INTERVAL, and once more when it exits
+    """
+
+    def __init__(self, leaderboard: Leaderboard):
+        super().__init__(name='trending-flusher', daemon=True)
+        self.leaderboard = leaderboard
+        self.stop = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stop.wait(settings.TRENDING_FLUSH_INTERVAL):
+                try:
+                    self.leaderboard.flush()
+                except Exception:
+                    logger.exception("could not persist trending scores")
+        finally:
+            connection.close()
+
+    def shutdown(self):
+        self.stop.set()
+        try:
+            self.leaderboard.flush()
+        except Exception:
+            logger.exception("could not persist trending scores")
+
+
+@lru_cache(maxsize=None)
+def get_leaderboard() -> Leaderboard:
+    leaderboard = Leaderboard()
+    flusher = Flusher(leaderboard)
+    flusher.start()
+    atexit.register(flusher.shutdown)
+    return leaderboard
+
+
+def record_event(listing_id: int, kind: str):
+    """
+    count a bid or comment toward the listing's trend once the current transaction commits\n
+    Examples:
+        record_event(3, 'bid')\n
+        record_event(3, 'comment')
+    """
+    score = event_score(kind)
+    transaction.on_commit(lambda: get_leaderboard().record(listing_id, score))
+
+
+def trending_listings(count: int) -> list:
+    """
+    the `count` hottest open listings, hottest first\n
+    Closed listings stay on the leaderboard until their score fades, the ranking is read further
+    down when they take up places
+    """
+    leaderboard = get_leaderboard()
+    wanted = count
+    while True:
+        ranked = [listing_id for listing_id, _ in leaderboard.top(wanted)]
+        listings = Listing.objects.in_bulk(ranked)
+        trending = [listings[pk] for pk in ranked if pk in listings and listings[pk].active]
+        if len(trending) >= count or len(ranked) < wanted:
+            return trending[:count]
+        wanted *= 2
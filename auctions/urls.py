@@ -1,19 +1,34 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
+
+def read_view(sync_view, async_view):
+    # the ASGI app serves the async variants, they run their independent queries concurrently
+    return async_view if settings.ASYNC_READ_VIEWS else sync_view
+
+
 urlpatterns = [
-    path("", views.index, name="index"),
+    path("", read_view(views.index, views.async_index), name="index"),
+    path("trending", views.trending, name="trending"),
+    path("search", views.search, name="search"),
     path("login", views.login_view, name="login"),
     path("logout", views.logout_view, name="logout"),
     path("register", views.register, name="register"),
     path("create_listing", views.create_listing, name="create_listing"),
-    path("listing_page/<int:listing_id>", views.listing_page, name="listing_page"),
+    path("listing_page/<int:listing_id>", read_view(views.listing_page, views.async_listing_page), name="listing_page"),
     path("categories", views.categories, name="categories"),
     path("categories/<int:category_id>", views.category, name="category"),
-    path("watchlist", views.watchlist, name="watchlist"),
+    path("watchlist", read_view(views.watchlist, views.async_watchlist), name="watchlist"),
     path("watchlist_state/<int:listing_id>", views.watchlist_change_state, name="watchlist_change_state"),
-    path("place_bid", views.place_bid, name="place_bid"),
+    path("watchlist_bulk", views.watchlist_bulk, name="watchlist_bulk"),
+    path("place_bid/<int:listing_id>", views.place_bid, name="place_bid"),
+    path("place_bid/bulk", views.place_bid_bulk, name="place_bid_bulk"),
+    path("price_history/<int:listing_id>", views.price_history, name="price_history"),
+    path("export/<str:dataset>", views.export, name="export"),
     path("listing_state/<int:listing_id>", views.listing_state, name="listing_state"),
+    path("listing_events/<int:listing_id>", views.listing_events, name="listing_events"),
     path("comments/<int:listing_id>", views.comments, name="comments"),
+    path("comments/<int:listing_id>/page", views.comment_page, name="comment_page"),
 ]
@@ -1,25 +1,82 @@
 import json
-from django.contrib.auth import authenticate, login, logout
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate, login, logout, get_user
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
-from django.http import JsonResponse
+from django.contrib.auth.views import redirect_to_login
+from django.db import IntegrityError, OperationalError
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, Http404
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.contrib import messages
 from datetime import datetime
-from django.utils import dateformat
-from django.db import transaction
+from django.utils import dateformat, timezone
+from django.conf import settings
 from django.core.files.storage import default_storage
 
-from .helpers import format_string_as_int, format_to_currency, ListingNotActive, BidTooLow, ObjectAlreadyInDatabase
+from .bidding import accept_bid, accept_bids, open_listing
+from .fanout import run_query, gather_queries
+from .events import get_broker, listing_channel, publish_listing_event, format_sse, serves_event_streams
+from .exports import EXPORTS, EXPORT_FORMATS, stream_export
+from .images import schedule_image_variants
+from .helpers import format_string_as_int, format_to_currency, parse_end_time, parse_bid_batch, ListingNotActive, BidTooLow, MaxBidTooLow, BidOnOwnListing, InvalidEndTime
+from .pagination import paginate_by_cursor
+from .price_history import price_history as get_price_history
+from .retry import retry_on_lock, is_lock_error
+from .routers import read_from_replica
+from .search import search_listings
+from .trending import trending_listings
+from .watchlists import add_to_watchlist, remove_from_watchlist, change_watchlist, replace_watchlist
 from .models import User, Listing, Category, Watchlist, Bid, Comments
 
 
+@read_from_replica
 def index(request):
-    listings = Listing.objects.all()
+    page = paginate_by_cursor(Listing.objects.filter(active=True), request.GET.get("cursor"))
     return render(request, "auctions/index.html", {
-        "listings": listings,
+        "listings": page.items,
+        "next_cursor": page.next_cursor,
+    })
+
+
+@read_from_replica
+async def async_index(request):
+    """
+    index for the ASGI app (ASYNC_READ_VIEWS), the session's user is loaded while the listings are read
+    """
+    page, request.user = await gather_queries(
+        lambda: paginate_by_cursor(Listing.objects.filter(active=True), request.GET.get("cursor")),
+        lambda: get_user(request),
+    )
+    return await sync_to_async(render)(request, "auctions/index.html", {
+        "listings": page.items,
+        "next_cursor": page.next_cursor,
+    })
+
+
+def trending(request):
+    return render(request, "auctions/index.html", {
+        "listings": trending_listings(settings.TRENDING_PAGE_SIZE),
+        "heading": "Trending",
+    })
+
+
+@read_from_replica
+def search(request):
+    query = request.GET.get("q", "").strip()
+    try:
+        page_number = int(request.GET.get("page", 1))
+    except ValueError:
+        page_number = 1
+    include_comments = request.GET.get("comments") != "off"
+
+    page = search_listings(query, page_number, include_comments)
+    return render(request, "auctions/index.html", {
+        "heading": f'Results for "{query}"',
+        "query": query,
+        "include_comments": include_comments,
+        "listings": page.items,
+        "next_page": page.next_page,
     })
 
 
@@ -30,10 +87,10 @@ def create_listing(request):
         try:
             exception_flag = True
             category = Category.objects.get(pk=request.POST["category"]) if request.POST["category"] != '' else None
+            end_time = parse_end_time(request.POST.get("end_time", ""))
 
             image = request.FILES["picture"]
-            filename = default_storage.get_available_name(image.name)
-            path = default_storage.save(filename, image)
+            path = default_storage.save(image.name, image)
             relative_path = default_storage.url(path)
 
             listing_data = {
@@ -41,25 +98,24 @@ def create_listing(request):
                 'author': request.user,
                 'description': request.POST["description"],
                 'picture': relative_path,
-                'category': category
+                'category': category,
+                'end_time': end_time
             }
             # only put attributes with values, otherwise use default values from database
             listing_data = {attribute:value for attribute,value in listing_data.items() if value}
             
-            # prevents the creation of only one of them if an exception is raised by undoing any changes made within it
-            with transaction.atomic():
-                price = format_string_as_int(request.POST["price"])
-                listing = Listing.objects.create(**listing_data)
-                bid = Bid.objects.create(
-                    price = price,
-                    user = listing_data["author"],
-                    listing = listing
-                )
+            listing = open_listing(listing_data, int(format_string_as_int(request.POST["price"])))
+            schedule_image_variants(listing.id, path)
             exception_flag = False
         except Category.DoesNotExist:
             messages.error(request, "Select one of the listed categories")
+        except InvalidEndTime:
+            messages.error(request, "The auction must end in the future")
         except ValueError:
             messages.error(request, "Price must be numeric")            
+        except OperationalError as e:
+            if not is_lock_error(e): raise
+            messages.error(request, "Too many changes at once, try again in a moment")
         except Exception as e:
             print(e)
             messages.error(request, "Can't create listing, maybe price is too high")
@@ -74,18 +130,58 @@ def create_listing(request):
         return render(request, "auctions/create_listing.html", {"categories":categories})
     
 
+@read_from_replica
 def listing_page(request, listing_id):
-    listing = get_object_or_404(Listing, pk=listing_id)
+    listing = get_object_or_404(Listing.objects.select_related('author', 'category'), pk=listing_id)
 
     try: 
         watchlist = Watchlist.objects.get(listing=listing, user=request.user) 
     except (ObjectDoesNotExist, TypeError): 
         watchlist = False
 
+    # only the newest comments are rendered, main.js fetches the next pages from comment_page
+    comments = paginate_by_cursor(
+        Comments.objects.filter(listing=listing).select_related("user"), None, page_size=settings.COMMENTS_PAGE_SIZE
+    )
     return render(request, "auctions/listing_page.html", {
         "listing":listing,
         "in_watchlist": watchlist,
-        "comments": Comments.objects.filter(listing=listing).order_by("-date")
+        "comments": comments.items,
+        "comments_cursor": comments.next_cursor,
+        "comment_count": listing.comments.count(),
+        "live_updates": serves_event_streams(request),
+    })
+
+
+@read_from_replica
+async def async_listing_page(request, listing_id):
+    """
+    listing_page for the ASGI app (ASYNC_READ_VIEWS)\n
+    None of its queries needs another one's result but the user's, so the listing, the
+    comments, their count and the session's user then their watchlist entry are read at the
+    same time: the page waits for the slowest of them instead of their sum
+    """
+    def user_watches_listing():
+        request.user = get_user(request)
+        return request.user.is_authenticated and Watchlist.objects.filter(listing_id=listing_id, user=request.user).exists()
+
+    listing, watchlist, comments, comment_count = await gather_queries(
+        lambda: Listing.objects.select_related('author', 'category').filter(pk=listing_id).first(),
+        user_watches_listing,
+        lambda: paginate_by_cursor(
+            Comments.objects.filter(listing_id=listing_id).select_related("user"), None, page_size=settings.COMMENTS_PAGE_SIZE
+        ),
+        lambda: Comments.objects.filter(listing_id=listing_id).count(),
+    )
+    if listing is None:
+        raise Http404("Listing does not exist")
+    return await sync_to_async(render)(request, "auctions/listing_page.html", {
+        "listing":listing,
+        "in_watchlist": watchlist,
+        "comments": comments.items,
+        "comments_cursor": comments.next_cursor,
+        "comment_count": comment_count,
+        "live_updates": serves_event_streams(request),
     })
 
 
@@ -100,11 +196,10 @@ def listing_state(request, listing_id):
             raise PermissionDenied
         
         if request.POST['change_state_to'] == 'open_auction':
-            listing.active = True
-            listing.save()
+            retry_on_lock(listing.open_auction)()
         else:
-            listing.active = False
-            listing.save()
+            retry_on_lock(listing.close_auction)()
+        publish_listing_event(listing.id, 'state', {'active': listing.active})
         return redirect(reverse('listing_page', args=[listing_id]))
     # api
     # if request.method == "POST":
@@ -133,6 +228,27 @@ def listing_state(request, listing_id):
     #     })
 
 
+async def listing_events(request, listing_id):
+    """
+    Server-Sent Events stream of a listing: accepted bids and auction open/close\n
+    Only works on the ASGI app, each open page is an idle coroutine instead of a busy thread.
+    Under WSGI it answers 204, which tells EventSource not to reconnect
+    """
+    if not serves_event_streams(request):
+        return HttpResponse(status=204)
+    if not await Listing.objects.filter(pk=listing_id).aexists():
+        raise Http404("Listing does not exist")
+
+    async def stream():
+        async for message in get_broker().subscribe(listing_channel(listing_id), heartbeat=settings.EVENTS_HEARTBEAT):
+            yield format_sse(message)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 # =============== COMMENTS ===============
 @login_required
 def comments(request, listing_id):
@@ -141,12 +257,11 @@ def comments(request, listing_id):
         if not data["comment"] or data["comment"].isspace():
             return JsonResponse({'error': "You can't leave blank comments"}, status=403)
 
-        comment = Comments.objects.create(
+        comment = retry_on_lock(Comments.objects.create)(
             text = data["comment"],
             user = request.user,
             listing = Listing.objects.get(pk=listing_id)
         )
-        comment.save()
 
         # messages.success(request, "Added comment")
         return JsonResponse({
@@ -156,109 +271,241 @@ def comments(request, listing_id):
         })
 
 
+@read_from_replica
+def comment_page(request, listing_id):
+    """
+    a page of a listing's comments after ?cursor=, newest first, as JSON
+    """
+    page = paginate_by_cursor(
+        Comments.objects.filter(listing_id=listing_id).select_related("user"), request.GET.get("cursor"),
+        page_size=settings.COMMENTS_PAGE_SIZE
+    )
+    return JsonResponse({
+        'comments': [{
+            'text': comment.text,
+            'user': comment.user.username,
+            'date': dateformat.format(timezone.localtime(comment.date), 'N j, Y, P'),
+        } for comment in page.items],
+        'next_cursor': page.next_cursor,
+    })
+
+
 # =============== BID ===============
 @login_required
-def place_bid(request):
+def place_bid(request, listing_id):
     if request.method == "POST":
         try:
             exception_flag = True
             data = json.loads(request.body)
-            last_bid = Bid.objects.last()
             bid = int(format_string_as_int(data['bid']))
-            if not last_bid.listing.active: raise ListingNotActive
-            if bid <= last_bid.price: raise BidTooLow
-            new_bid = Bid.objects.create(
-                price = bid,
-                user = request.user,
-                listing = last_bid.listing
-            )
-            new_bid.save()
+            max_bid = int(format_string_as_int(data['max_bid'])) if data.get('max_bid') else None
+            leading_bid = accept_bid(listing_id, request.user, bid, max_bid)
+            publish_listing_event(listing_id, 'bid', {'price': format_to_currency(leading_bid.price), 'bidder': leading_bid.user.username})
             exception_flag = False
         except json.JSONDecodeError:
             message = "JSON error"
-        except (Bid.DoesNotExist, Bid.MultipleObjectsReturned):
-            message = "Database query error"
+        except Listing.DoesNotExist:
+            message = "Request to non existent listing"
         except ValueError:
             message = "Bid must be a number"
         except ListingNotActive: 
             message = "Auction is closed, listing no longer active"
+        except BidOnOwnListing:
+            message = "You can't bid on your own listing"
         except BidTooLow:
             message = "Your bid should be greater than the last bid"
+        except MaxBidTooLow:
+            message = "Your maximum bid can't be lower than your bid"
+        except OperationalError as e:
+            message = "Too many bids at once, try again in a moment" if is_lock_error(e) else "Can't place bid"
         except Exception as e:
             message = "Can't place bid"
         finally:
             if exception_flag:
                 return JsonResponse({'error': message}, status=403)
            
-        message = "Bid placed, you are ahead to get that item!"
-        return JsonResponse({'bid': format_to_currency(bid), 'message': message})    
+        if leading_bid.user_id != request.user.id:
+            message = "Bid placed, but another bidder's maximum is higher"
+        else:
+            message = "Bid placed, you are ahead to get that item!"
+        return JsonResponse({'bid': format_to_currency(leading_bid.price), 'message': message})    
+
+
+@login_required
+def place_bid_bulk(request):
+    """
+    place up to BID_BATCH_MAX bids in one request, as a JSON array or JSON lines of
+    [listing_id, price] or {"listing_id": id, "price": price}, see accept_bids\n
+    The batch isn't all or nothing, every bid gets its own status:
+    {"results": [{"listing_id": 3, "price": 7589, "status": "accepted"}, ...]}
+    """
+    if request.method == "POST":
+        try:
+            exception_flag = True
+            items = parse_bid_batch(request.body, request.content_type)
+            if len(items) > settings.BID_BATCH_MAX:
+                raise ValueError("too many bids")
+            results, leading_bids = accept_bids(request.user, items)
+            exception_flag = False
+        except json.JSONDecodeError:
+            message = "JSON error"
+        except ValueError:
+            message = f"Bids must be a list of at most {settings.BID_BATCH_MAX} [listing_id, price] pairs"
+        except OperationalError as e:
+            message = "Too many bids at once, try again in a moment" if is_lock_error(e) else "Can't place bids"
+        except Exception as e:
+            message = "Can't place bids"
+        finally:
+            if exception_flag:
+                return JsonResponse({'error': message}, status=403)
+
+        usernames = dict(User.objects.filter(pk__in={bid.user_id for bid in leading_bids.values()}).values_list('id', 'username'))
+        for listing_id, bid in leading_bids.items():
+            publish_listing_event(listing_id, 'bid', {'price': format_to_currency(bid.price), 'bidder': usernames[bid.user_id]})
+        return JsonResponse({'results': results})
+
+
+@read_from_replica
+def price_history(request, listing_id):
+    """
+    a listing's price over time as JSON, downsampled to ?points= (PRICE_HISTORY_POINTS by default), see auctions.price_history
+    """
+    try:
+        points = int(request.GET.get("points", settings.PRICE_HISTORY_POINTS))
+    except ValueError:
+        points = settings.PRICE_HISTORY_POINTS
+    points = max(2, min(points, settings.PRICE_HISTORY_MAX_POINTS))
+    try:
+        return JsonResponse(get_price_history(listing_id, points))
+    except Listing.DoesNotExist:
+        return JsonResponse({'error': 'Request to non existent listing'}, status=404)
+
+
+# =============== EXPORTS ===============
+# not @read_from_replica: the rows are read while the response streams, after the view returned
+@login_required
+def export(request, dataset):
+    """
+    closed auctions with their winner (dataset 'auctions') or their bids ('bids') as ?format=csv or jsonl, for staff\n
+    Streamed a chunk of EXPORT_CHUNK_SIZE rows at a time, see auctions.exports
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+    if dataset not in EXPORTS:
+        raise Http404
+    export_format = request.GET.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"Unknown format, use one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+    response = StreamingHttpResponse(stream_export(dataset, export_format), content_type=EXPORT_FORMATS[export_format])
+    response["Content-Disposition"] = f'attachment; filename="{dataset}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"'
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 # =============== CATEGORY =============== 
+@read_from_replica
 def categories(request):
     categories = Category.objects.all()
     return render(request, "auctions/categories.html", {"categories":categories})
 
 
+@read_from_replica
 def category(request, category_id):
     category = get_object_or_404(Category, pk=category_id)
-    listings = category.listings.all()
-    return render(request, "auctions/index.html", {"listings":listings})
+    page = paginate_by_cursor(category.listings.all(), request.GET.get("cursor"))
+    # the stats are stored on the category, see auctions/category_stats.py
+    return render(request, "auctions/index.html", {
+        "heading": category.name,
+        "category": category,
+        "listings": page.items,
+        "next_cursor": page.next_cursor,
+    })
 
 
 # =============== WATCHLIST =============== 
 @login_required
+@read_from_replica
 def watchlist(request):
     user = get_object_or_404(User, pk=request.user.id)
-    watchlist = Watchlist.objects.filter(user=user)
-    return render(request, "auctions/watchlist.html", {"watchlist":watchlist})
+    # most recently watched first, Watchlist rows have no date so the id is the key
+    page = paginate_by_cursor(Watchlist.objects.filter(user=user).select_related('listing'), request.GET.get("cursor"), fields=('id',))
+    return render(request, "auctions/watchlist.html", {"watchlist":page.items, "next_cursor":page.next_cursor})
+
+
+@read_from_replica
+async def async_watchlist(request):
+    """
+    watchlist for the ASGI app (ASYNC_READ_VIEWS)\n
+    Not @login_required: it would load the user on asgiref's single thread, one request at a time
+    """
+    request.user = await run_query(get_user, request)
+    if not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    page = await run_query(
+        paginate_by_cursor, Watchlist.objects.filter(user=request.user).select_related('listing'), request.GET.get("cursor"),
+        fields=('id',)
+    )
+    return await sync_to_async(render)(request, "auctions/watchlist.html", {"watchlist":page.items, "next_cursor":page.next_cursor})
 
 
 @login_required
 def watchlist_change_state(request, listing_id: int):
     if request.method == "POST":
-        user = request.user
-        listing = get_object_or_404(Listing, pk=listing_id)                 
-        data = json.loads(request.body)
+        try:
+            exception_flag = True
+            data = json.loads(request.body)
+            # both are idempotent: adding a watched listing or removing an unwatched one changes nothing
+            if data.get('new_state') == 'in_watchlist':
+                action = "add"
+                changed = add_to_watchlist(request.user, [listing_id])
+            else:
+                action = "delete"
+                changed = remove_from_watchlist(request.user, [listing_id])
+            exception_flag = False
+        except json.JSONDecodeError:
+            message = "JSON error"
+        except Exception as e:
+            message = "An error occurred while changing the watchlist"
+        finally:
+            if exception_flag:
+                return JsonResponse({'error': message}, status=403)
 
-        if data.get('new_state') == 'in_watchlist':
-            action = "add"
-            try:
-                exception_flag = True
-                if Watchlist.objects.filter(user=user, listing=listing): raise ObjectAlreadyInDatabase
-                add = Watchlist.objects.create(user=user, listing=listing) 
-                add.save()
-                exception_flag = False
-            except ObjectAlreadyInDatabase:
-                message = "Watchlist entry already in database"
-                raise ObjectAlreadyInDatabase("Watchlist entry already in database")
-            except Watchlist.DoesNotExist:
-                message = "Cannot add to watchlist: entry does not exist"
-                raise ObjectDoesNotExist("Watchlist entry does not exist")
-            except Exception as e:
-                message = "An error occurred while adding to watchlist"
-                raise e
-            finally:
-                if exception_flag:
-                    return JsonResponse({'error': message}, status=403)
-        else:
-            action = "delete"
-            try:
-                exception_flag = True
-                delete = Watchlist.objects.get(user=user, listing=listing)
-                delete.delete()
-                exception_flag = False
-            except Watchlist.DoesNotExist:
-                message = "Cannot delete from watchlist: entry does not exist"
-                raise ObjectDoesNotExist("Watchlist entry does not exist")
-            except Exception as e:
-                message = "An error occurred while deleting from watchlist"
-                raise e
-            finally:
-                if exception_flag:
-                    return JsonResponse({'error': message}, status=403)
-            
+        # nothing changed: already in that state, or there's no such listing
+        if not changed and not Listing.objects.filter(pk=listing_id).exists():
+            raise Http404("Listing does not exist")
         return JsonResponse({'state': action})
+
+
+@login_required
+def watchlist_bulk(request):
+    """
+    add and remove many listings in one request: {"add": [ids], "remove": [ids]}\n
+    or sync the whole watchlist to a list of ids: {"set": [ids]}
+    """
+    if request.method == "POST":
+        try:
+            exception_flag = True
+            data = json.loads(request.body)
+            operations = {key: [int(pk) for pk in data.get(key, [])] for key in ('add', 'remove', 'set')}
+            if any(len(ids) > settings.WATCHLIST_BULK_MAX for ids in operations.values()):
+                raise ValueError("too many listings")
+            if 'set' in data:
+                added, removed = replace_watchlist(request.user, operations['set'])
+            else:
+                added, removed = change_watchlist(request.user, operations['add'], operations['remove'])
+            exception_flag = False
+        except json.JSONDecodeError:
+            message = "JSON error"
+        except (ValueError, TypeError):
+            message = f"Listings must be lists of at most {settings.WATCHLIST_BULK_MAX} ids"
+        except Exception as e:
+            message = "An error occurred while changing the watchlist"
+        finally:
+            if exception_flag:
+                return JsonResponse({'error': message}, status=403)
+
+        return JsonResponse({'added': added, 'removed': removed})
     
 
 # =============== LOGIN =============== 
@@ -0,0 +1,62 @@
+from django.db import connection, transaction
+
+from .models import Listing, Watchlist
+from .retry import retry_on_lock
+
+
+@retry_on_lock
+def add_to_watchlist(user, listing_ids: list) -> int:
+    """
+    watch listings in one INSERT, idempotent\n
+    Ids already in the watchlist are skipped by the (user, listing) unique constraint and ids
+    of listings that don't exist are skipped by the SELECT, instead of checking either first.\n
+    Returns how many entries were inserted, 0 when every listing was watched already or doesn't exist
+    """
+    if not listing_ids:
+        return 0
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        existing = Listing.objects.filter(pk__in=listing_ids).values_list('id', flat=True)
+        return len(Watchlist.objects.bulk_create([Watchlist(user=user, listing_id=pk) for pk in existing], ignore_conflicts=True))
+
+    placeholders = ', '.join(['%s'] * len(listing_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO auctions_watchlist (user_id, listing_id) "
+            f"SELECT %s, id FROM auctions_listing WHERE id IN ({placeholders}) "
+            "ON CONFLICT (user_id, listing_id) DO NOTHING",
+            [user.pk, *listing_ids]
+        )
+        return cursor.rowcount
+
+
+@retry_on_lock
+def remove_from_watchlist(user, listing_ids: list) -> int:
+    """
+    stop watching listings in one DELETE, idempotent\n
+    Returns how many entries were removed
+    """
+    if not listing_ids:
+        return 0
+    return Watchlist.objects.filter(user=user, listing_id__in=listing_ids).delete()[0]
+
+
+@retry_on_lock
+def change_watchlist(user, add: list, remove: list) -> tuple[int, int]:
+    """
+    add and remove listings in one transaction, one statement each\n
+    Returns how many entries were added and removed
+    """
+    with transaction.atomic():
+        removed = remove_from_watchlist(user, remove)
+        return add_to_watchlist(user, add), removed
+
+
+@retry_on_lock
+def replace_watchlist(user, listing_ids: list) -> tuple[int, int]:
+    """
+    make the watchlist exactly listing_ids: one DELETE of the others, one INSERT of the missing ones\n
+    Returns how many entries were added and removed
+    """
+    with transaction.atomic():
+        removed = Watchlist.objects.filter(user=user).exclude(listing_id__in=listing_ids).delete()[0]
+        return add_to_watchlist(user, listing_ids), removed
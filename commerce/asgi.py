@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'commerce.settings')
+# read before the settings are, see ASYNC_READ_VIEWS
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
+
+if settings.AUCTION_SCHEDULER_IN_ASGI:
+    from auctions.scheduler import with_scheduler_lifespan
+    application = with_scheduler_lifespan(application)
@@ -31,11 +31,23 @@ ALLOWED_HOSTS = []
 # Application definition
 
 # ========================= ADDED BY ME =============================
-# USE FLASH MESSAGES
-MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
+# USE FLASH MESSAGES, kept in a signed cookie until they're shown so they never touch the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
 #redirect when @login_required
 LOGIN_URL = 'login'
 AUTH_USER_MODEL = 'auctions.User'
+# listings per page on index, category and watchlist
+LISTINGS_PAGE_SIZE = 24
+# comments rendered with a listing page, and per "load more" after that
+COMMENTS_PAGE_SIZE = 20
+# most listing ids one watchlist_bulk request can add, remove or set
+WATCHLIST_BULK_MAX = 1000
+# formatted prices memoized per process, 0 turns the memo off
+CURRENCY_FORMAT_CACHE_SIZE = 4096
+# search results are ranked, so they're paged by number instead of keyset, up to this page
+SEARCH_MAX_PAGE = 40
+# send query count, DB time and template time back as response headers
+REQUEST_METRICS_HEADERS = DEBUG
 
 INSTALLED_APPS = [
     'auctions',
@@ -48,7 +60,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'auctions.metrics.RequestMetricsMiddleware',
+    'auctions.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'auctions.assets.AssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,7 +76,8 @@ ROOT_URLCONF = 'commerce.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timed per request for auctions.metrics.RequestMetricsMiddleware
+        'BACKEND': 'auctions.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -70,6 +86,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'auctions.context_processors.fragment_cache',
             ],
         },
     },
@@ -88,6 +105,154 @@ DATABASES = {
     }
 }
 
+# SQLite tuned for concurrent requests:
+#   - WAL lets readers carry on while a write commits, synchronous=NORMAL is durable with WAL
+#     except on power loss, where the last commits may be rolled back
+#   - transactions take the write lock when they BEGIN (IMMEDIATE), so a reader turning writer
+#     waits on busy_timeout ('timeout', seconds) instead of failing at once with "database is locked"
+#   - connections stay open between requests of a worker thread (CONN_MAX_AGE)
+SQLITE_PROFILE = {
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'timeout': 5,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA mmap_size=268435456;'
+            'PRAGMA cache_size=-65536;'
+            'PRAGMA temp_store=MEMORY;'
+        ),
+    },
+}
+DATABASES['default'].update(SQLITE_PROFILE)
+# writes that still find the database locked run again this many times, waiting up to
+# DATABASE_LOCK_RETRY_DELAY * 2**attempt seconds in between (auctions/retry.py)
+DATABASE_LOCK_RETRIES = 4
+DATABASE_LOCK_RETRY_DELAY = 0.05
+
+# run against a local PostgreSQL instead of db.sqlite3, e.g. for the bid contention benchmark
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', ''),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+    }
+
+# read replicas, see auctions/routers.py: the views decorated with read_from_replica read from them,
+# every write goes to 'default'. Locally, SQLITE_REPLICAS lists copies of db.sqlite3 that
+# `manage.py sync_sqlite_replicas` refreshes, POSTGRES_REPLICA_HOSTS lists host[:port] of streaming replicas
+if os.environ.get('SQLITE_REPLICAS'):
+    for i, path in enumerate(os.environ['SQLITE_REPLICAS'].split(',')):
+        DATABASES[f'replica_{i}'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'TEST': {'MIRROR': 'default'},
+        }
+elif os.environ.get('POSTGRES_DB') and os.environ.get('POSTGRES_REPLICA_HOSTS'):
+    for i, address in enumerate(os.environ['POSTGRES_REPLICA_HOSTS'].split(',')):
+        host, _, port = address.partition(':')
+        DATABASES[f'replica_{i}'] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['auctions.routers.PrimaryReplicaRouter']
+# after a write a user reads from the primary this long (seconds), longer than the replication lag
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'read_primary'
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+# CACHE_BACKEND picks where rendered listing cards and the category list are kept:
+# 'locmem' (default, one cache per process), 'file' or 'redis' (shared by every worker)
+# with more than one worker use a shared one, bids only evict the fragments of the worker that took them
+# (the system checks warn about locmem with DEBUG off)
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auctions',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, '.cache')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379'),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')],
+}
+# SESSION_STORAGE picks where sessions are kept, only 'db' reads the session table on every request:
+# 'cached_db' (default, read from the cache, written through to the database so a cache miss doesn't log anyone out),
+# 'cache' (the cache only, use a shared CACHE_BACKEND with several workers), 'signed_cookies' (in the cookie itself)
+# or 'db' (Django's default)
+
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_STORAGE', 'cached_db')]
+# the auction scheduler deletes expired rows of the session table this often (seconds), this many per query
+SESSION_PURGE_INTERVAL = 60 * 60
+SESSION_PURGE_BATCH_SIZE = 1000
+# listing pictures are downscaled off the request thread to these max sizes (px), as WebP
+IMAGE_VARIANTS = {
+    'thumbnail': 480,
+    'display': 1200,
+}
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_WORKERS = 2
+# proxy bids outbid each other by this many cents
+BID_INCREMENT = 100
+# bids accepted by one place_bid_bulk request
+BID_BATCH_MAX = 1000
+# price history charts: points returned by default and at most, seconds a series stays cached
+PRICE_HISTORY_POINTS = 500
+PRICE_HISTORY_MAX_POINTS = 2000
+PRICE_HISTORY_CACHE_TIMEOUT = 600
+# trending feed: what a bid and a comment are worth, seconds for that to halve, seconds between
+# writes of each process's scores to the database, listings ranked in memory, listings per page
+TRENDING_WEIGHTS = {
+    'bid': 1.0,
+    'comment': 0.5,
+}
+TRENDING_HALF_LIFE = 60 * 60
+TRENDING_FLUSH_INTERVAL = 30
+TRENDING_CAPACITY = 1000
+TRENDING_PAGE_SIZE = 20
+# rows read from the database per query, and written per chunk, by exports (manage.py export_auctions, /export)
+EXPORT_CHUNK_SIZE = 2000
+# a bid in the last seconds of a timed auction extends it to this many seconds from the bid
+AUCTION_SOFT_CLOSE_SECONDS = 120
+# the scheduler closes at most this many auctions per query, and looks for new ones this often (seconds)
+AUCTION_SCHEDULER_BATCH_SIZE = 500
+AUCTION_SCHEDULER_POLL_INTERVAL = 1.0
+# run the scheduler inside the ASGI server (one worker only!) instead of `manage.py run_auction_scheduler`,
+# which refuses to start with a process-local cache or EVENT_BROKER since its evictions and events wouldn't reach the workers
+AUCTION_SCHEDULER_IN_ASGI = False
+# pub/sub backend of the listing event stream (served by the ASGI app), must subclass auctions.events.Broker
+EVENT_BROKER = 'auctions.events.InProcessBroker'
+# seconds between keep-alive comments on idle event streams
+EVENTS_HEARTBEAT = 15
+# serve index, listing_page and watchlist with their async variants, on by default in commerce/asgi.py
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '0') == '1'
+# threads (and database connections) the async views run their queries on, per process
+ASYNC_QUERY_WORKERS = 16
+# seconds a rendered fragment lives, signals evict it earlier when its data changes
+FRAGMENT_CACHE_TIMEOUT = 600
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -127,4 +292,21 @@ USE_TZ = True
 STATIC_URL = '/static/'
 MEDIA_URL = '/auctions/ai-images/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static/auctions')
-MEDIA_ROOT = os.path.join(BASE_DIR, 'auctions/static/auctions/ai-images')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'auctions/static/auctions/ai-images')
+
+STORAGES = {
+    # uploads and their variants are saved under a content-hashed name, see auctions.storage
+    'default': {
+        'BACKEND': 'auctions.storage.HashedMediaStorage',
+    },
+    # collectstatic writes hashed, precompressed copies; DEBUG serves the app folders as they are
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'auctions.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Cache-Control max-age (seconds) for content-hashed static and media files, served by auctions.assets.AssetMiddleware
+ASSET_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60